@@ -11,6 +11,7 @@ import re
 import sys
 from configparser import NoOptionError, NoSectionError
 from datetime import timedelta
+from functools import lru_cache
 
 from dateutil.relativedelta import FR as FRIDAY
 from dateutil.relativedelta import MO as MONDAY
@@ -74,11 +75,26 @@ class ReportError(GeneralError):
 #  Config
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+@lru_cache(maxsize=32)
+def _parse_config(config: str) -> dict:
+    """ Parse config string, the same string is parsed only once """
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read_file(io.StringIO(config))
+    # Keep plain values only, each config gets its own parser
+    sections = {parser.default_section: dict(parser.defaults())}
+    for section in parser.sections():
+        sections[section] = dict(parser.items(section, raw=True))
+    return sections
+
+
 class Config(object):
     """ User config file """
 
     parser = None
 
+    # Section items already looked up, by section and skipped keys
+    _sections = {}
+
     def __init__(self, config=None, path=None):
         """
         Read the config file
@@ -90,12 +106,13 @@ class Config(object):
         # Read the config only once (unless explicitly provided)
         if self.parser is not None and config is None and path is None:
             return
+        Config._sections = {}
         Config.parser = configparser.ConfigParser(interpolation=None)
         # If config provided as string, parse it directly
         if config is not None:
             log.info("Inspecting config file from string")
             log.debug(utils.pretty(config))
-            self.parser.read_file(io.StringIO(config))
+            Config.parser.read_dict(_parse_config(config))
             return
         # Check the environment for config file override
         # (unless path is explicitly provided)
@@ -187,8 +204,12 @@ class Config(object):
         """
         Return section items, skip selected (type/order by default)
         """
-        return [(key, val) for key, val in self.parser.items(section)
+        cached = (section, tuple(skip))
+        if cached not in self._sections:
+            self._sections[cached] = [
+                (key, val) for key, val in self.parser.items(section)
                 if key not in skip]
+        return list(self._sections[cached])
 
     def item(self, section, it):
         """ Return content of given item in selected section """
@@ -507,6 +528,13 @@ class User(object):
             log.info("Using login alias '{0}' for '{1}'".format(login, stats))
 
 
+@lru_cache(maxsize=None)
+def _read_token_file(file_path: str, mtime: int, size: int) -> str:
+    """ Read the token file, only once unless modified """
+    with open(file_path, encoding="utf-8") as token_file:
+        return token_file.read().strip()
+
+
 def get_token(
         config: dict,
         token_key: str = "token",
@@ -542,8 +570,9 @@ def get_token(
         token = str(config[token_key]).strip()
     elif token_file_key in config:
         file_path = os.path.expanduser(config[token_file_key])
-        with open(file_path, encoding="utf-8") as token_file:
-            token = token_file.read().strip()
+        # Size is checked as well in case of a coarse mtime resolution
+        stat = os.stat(file_path)
+        token = _read_token_file(file_path, stat.st_mtime_ns, stat.st_size)
 
     if token == "":
         token = None
@@ -64,14 +64,17 @@ token_name
 import os
 import re
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 from requests_gssapi import DISABLED, HTTPSPNEGOAuth
 
 from did.base import Config, ReportError, get_token
 from did.stats import Stats, StatsGroup
-from did.utils import listed, log, pretty, strtobool
+from did.utils import LOG_DATA, LOG_DEBUG, listed, log, pretty, strtobool
 
 # Maximum number of results fetched at once
 MAX_RESULTS = 100
@@ -79,12 +82,25 @@ MAX_RESULTS = 100
 # Maximum number of batches
 MAX_BATCHES = 100
 
+# Maximum number of batches fetched in parallel
+MAX_WORKERS = 8
+
+# Size of the connection pool
+POOL_SIZE = 32
+
+# Retry failed requests (connection errors and server overload)
+RETRY = Retry(
+    total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+
 # Supported authentication types
 AUTH_TYPES = ["gss", "basic", "token"]
 
 # Enable ssl verify
 SSL_VERIFY = True
 
+# Comment title prefix to be removed
+RE_PREFIX = re.compile(r"^Re: ")
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Issue Investigator
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -93,36 +109,67 @@ SSL_VERIFY = True
 class Confluence(object):
     """ Confluence investigator """
 
+    __slots__ = ()
+
     @staticmethod
     def search(query, stats, expand=None):
-        """ Perform page/comment search for given stats instance """
-        log.debug("Search query: {0}".format(query))
-        content = []
+        """
+        Perform page/comment search for given stats instance
 
-        # Fetch data from the server in batches of MAX_RESULTS issues
-        for batch in range(MAX_BATCHES):
+        Results are yielded batch by batch as they arrive so that the
+        raw data of already processed batches can be released early.
+        """
+        log.debug("Search query: {0}".format(query))
+        # Only the start offset changes, encode the rest just once
+        url = "{0}/rest/api/content/search?{1}&start=".format(
+            stats.parent.url, urllib.parse.urlencode({
+                "cql": query,
+                "limit": MAX_RESULTS,
+                "expand": expand}))
+
+        def fetch_batch(batch):
+            """ Fetch a single batch of MAX_RESULTS issues """
             response = stats.parent.session.get(
-                "{0}/rest/api/content/search?{1}".format(
-                    stats.parent.url, urllib.parse.urlencode({
-                        "cql": query,
-                        "limit": MAX_RESULTS,
-                        "expand": expand,
-                        "start": batch * MAX_RESULTS})))
+                "{0}{1}".format(url, batch * MAX_RESULTS))
             data = response.json()
-            log.debug(
-                "Batch {0} result: {1} fetched".format(
-                    batch, listed(data["results"], "object")))
-            log.data(pretty(data))
-            content.extend(data["results"])
-            # If all issues fetched, we're done
-            if data['_links'].get('next') is None:
-                break
-        return content
+            # Format the whole batch only when it is going to be logged
+            if log.isEnabledFor(LOG_DEBUG):
+                log.debug(
+                    "Batch {0} result: {1} fetched".format(
+                        batch, listed(data["results"], "object")))
+            if log.isEnabledFor(LOG_DATA):
+                log.data(pretty(data))
+            return data
+
+        # The first batch tells us how many results there are
+        data = fetch_batch(0)
+        yield from data["results"]
+        # If all issues fetched, we're done
+        if data['_links'].get('next') is None:
+            return
+
+        # Walk the batches one by one if the total size is unknown
+        total = data.get("totalSize")
+        if total is None:
+            for batch in range(1, MAX_BATCHES):
+                data = fetch_batch(batch)
+                yield from data["results"]
+                if data['_links'].get('next') is None:
+                    break
+            return
+
+        # Otherwise fetch all remaining batches concurrently
+        batches = range(1, min(-(-total // MAX_RESULTS), MAX_BATCHES))
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for data in executor.map(fetch_batch, batches):
+                yield from data["results"]
 
 
 class ConfluencePage(Confluence):
     """ Confluence page results """
 
+    __slots__ = ('title', 'url', 'format')
+
     def __init__(self, page, url, myformat):
         """ Initialize the page """
         self.title = page['title']
@@ -139,17 +186,49 @@ class ConfluencePage(Confluence):
 class ConfluenceComment(Confluence):
     """ Confluence comment results """
 
+    __slots__ = ('title', 'body', 'url', 'format')
+
     def __init__(self, comment, url, myformat):
         """ Initialize issue """
         # Remove the 'Re:' prefix
-        self.title = re.sub('^Re: ', '', comment['title'])
-        self.body = comment['body']['editor']['value']
+        self.title = RE_PREFIX.sub('', comment['title'])
         # Remove html tags
-        self.body = re.sub('</p><p>', ' ', self.body)
-        self.body = re.sub('<[^<]+?>', '', self.body)
+        self.body = self.strip_html(comment['body']['editor']['value'])
         self.url = url
         self.format = myformat
 
+    @staticmethod
+    def strip_html(text):
+        """ Remove html tags, join paragraphs, all in a single pass """
+        # Nothing to do for plain text
+        if '<' not in text:
+            return text
+        result = []
+        start = 0
+        while True:
+            tag = text.find('<', start)
+            if tag < 0:
+                result.append(text[start:])
+                break
+            result.append(text[start:tag])
+            if text.startswith('</p><p>', tag):
+                result.append(' ')
+                start = tag + 7
+                continue
+            end = text.find('>', tag + 2)
+            # Keep unterminated tags as they are
+            if end < 0:
+                result.append(text[tag:])
+                break
+            # Another tag opened before this one was closed
+            opened = text.find('<', tag + 1, end)
+            if opened >= 0:
+                result.append(text[tag:opened])
+                start = opened
+                continue
+            start = end + 1
+        return ''.join(result)
+
     def __str__(self):
         """ Confluence title & comment snippet for displaying """
         # TODO: implement markdown output here
@@ -212,24 +291,19 @@ class ConfluenceStats(StatsGroup):
         self._session = None
         # Make sure there is an url provided
         config = dict(Config().section(option))
-        if "url" not in config:
+        url = config.get("url")
+        if url is None:
             raise ReportError(
                 "No Confluence url set in the [{0}] section".format(option))
-        self.url = config["url"].rstrip("/")
+        self.url = url.rstrip("/")
         # Optional authentication url
-        if "auth_url" in config:
-            self.auth_url = config["auth_url"]
-        else:
-            self.auth_url = self.url + "/step-auth-gss"
+        self.auth_url = config.get("auth_url", self.url + "/step-auth-gss")
         # Authentication type
-        if "auth_type" in config:
-            if config["auth_type"] not in AUTH_TYPES:
-                raise ReportError(
-                    "Unsupported authentication type: {0}".format(
-                        config["auth_type"]))
-            self.auth_type = config["auth_type"]
-        else:
-            self.auth_type = "gss"
+        auth_type = config.get("auth_type", "gss")
+        if auth_type not in AUTH_TYPES:
+            raise ReportError(
+                "Unsupported authentication type: {0}".format(auth_type))
+        self.auth_type = auth_type
         # Authentication credentials
         if self.auth_type == "basic":
             if "auth_username" not in config:
@@ -278,19 +352,19 @@ class ConfluenceStats(StatsGroup):
             else:
                 self.token_expiration = self.token_name = None
         # SSL verification
-        if "ssl_verify" in config:
+        ssl_verify = config.get("ssl_verify")
+        if ssl_verify is not None:
             try:
-                self.ssl_verify = strtobool(
-                    config["ssl_verify"])
+                self.ssl_verify = strtobool(ssl_verify)
             except Exception as error:
                 raise ReportError(
                     "Error when parsing 'ssl_verify': {0}".format(error))
         else:
             self.ssl_verify = SSL_VERIFY
 
-        self.login = config.get("login", None)
+        self.login = config.get("login")
         # Check for custom prefix
-        self.prefix = config["prefix"] if "prefix" in config else None
+        self.prefix = config.get("prefix")
         # Create the list of stats
         self.stats = [
             PageCreated(
@@ -308,6 +382,13 @@ class ConfluenceStats(StatsGroup):
         """ Initialize the session """
         if self._session is None:
             self._session = requests.Session()
+            # Reuse connections for all requests, retry on failures
+            adapter = HTTPAdapter(
+                pool_connections=POOL_SIZE,
+                pool_maxsize=POOL_SIZE,
+                max_retries=RETRY)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
             log.debug("Connecting to {0}".format(self.auth_url))
             # Disable SSL warning when ssl_verify is False
             if not self.ssl_verify:
@@ -318,7 +399,7 @@ class ConfluenceStats(StatsGroup):
                 response = self._session.get(
                     self.auth_url, auth=basic_auth, verify=self.ssl_verify)
             elif self.auth_type == "token":
-                self.session.headers["Authorization"] = f"Bearer {self.token}"
+                self._session.headers["Authorization"] = f"Bearer {self.token}"
                 response = self._session.get(
                     "{0}/rest/api/content".format(self.url),
                     verify=self.ssl_verify)
@@ -347,7 +428,6 @@ class ConfluenceStats(StatsGroup):
                         raise ValueError(
                             f"Can't check validity for the '{self.token_name}' "
                             f"token as it doesn't exist.")
-                    from datetime import datetime
                     expiring_at = datetime.strptime(
                         token_found["expiringAt"], r"%Y-%m-%dT%H:%M:%S.%f%z")
                     delta = (
@@ -15,12 +15,28 @@ Config example::
 
 import json
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
 
 from did.base import TODAY, Config, ReportError
 from did.stats import Stats, StatsGroup
-from did.utils import log, pretty
+from did.utils import LOG_DEBUG, log, pretty
+
+# Size of the connection pool
+POOL_SIZE = 32
+
+# Timeout for a single request (in seconds)
+TIMEOUT = 30
+
+# Maximum number of changelogs fetched in parallel
+MAX_WORKERS = 8
+
+# Additional fields needed for processing changelogs
+CHANGELOG_OPTIONS = ['MESSAGES', 'DETAILED_ACCOUNTS']
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Change
@@ -64,7 +80,10 @@ class Gerrit(object):
     """
 
     def __init__(self, baseurl, prefix):
-        self.opener = urllib.request.FancyURLopener()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.baseurl = baseurl
         self.prefix = prefix
 
@@ -76,32 +95,43 @@ class Gerrit(object):
 
     def get_query_result(self, url):
         log.debug('url = {0}'.format(url))
-        res = self.opener.open(url)
-        if res.getcode() != 200:
+        response = self.session.get(url, timeout=TIMEOUT)
+        if response.status_code != 200:
             raise IOError(
-                'Cannot retrieve list of changes ({0})'.format(res.getcode()))
+                'Cannot retrieve list of changes ({0})'.format(
+                    response.status_code))
 
         # see https://code.google.com/p/gerrit/issues/detail?id=2006
         # for explanation of skipping first four characters
-        json_str = res.read()[4:].strip()
+        json_str = response.content[4:].strip()
         try:
             data = json.loads(json_str)
         except ValueError:
             log.exception('Cannot parse JSON data:\n%s', json_str)
             raise
-        res.close()
 
         return data
 
     def get_changelog(self, chg):
         messages_url = self.join_URL_frags(
-            self.baseurl, '/changes/{0}/detail'.format(chg.change_id))
+            self.baseurl, '/changes/{0}?{1}'.format(
+                chg.change_id,
+                '&'.join('o=' + option for option in CHANGELOG_OPTIONS)))
         changelog = self.get_query_result(messages_url)
-        log.debug("changelog = {0}".format(changelog))
+        if log.isEnabledFor(LOG_DEBUG):
+            log.debug("changelog = {0}".format(changelog))
         return changelog
 
-    def search(self, query):
-        full_url = self.join_URL_frags(self.baseurl, '/changes/?q=' + query)
+    def search(self, query, options=None):
+        """
+        Search changes, optionally request additional fields
+
+        Use ``options`` to provide list of additional fields which
+        should be included for each change, e.g. ``['MESSAGES']``.
+        """
+        full_url = self.join_URL_frags(
+            self.baseurl, '/changes/?q=' + query + ''.join(
+                '&o=' + option for option in options or []))
         log.debug('full_url = {0}'.format(full_url))
         tickets = []
 
@@ -114,7 +144,7 @@ class Gerrit(object):
             tmplist = []
             for sublist in tickets:
                 tmplist.extend(sublist)
-            tickets = tmplist[:]
+            tickets = tmplist
 
         return tickets
 
@@ -137,10 +167,42 @@ class GerritUnit(Stats):
 
     @staticmethod
     def get_gerrit_date(instr):
-        return datetime.strptime(str(instr), '%Y-%m-%d').date()
+        return GerritUnit._parse_date(str(instr)[:10])
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_date(date):
+        """ Parse the date string, cached as dates repeat a lot """
+        return datetime.strptime(date, '%Y-%m-%d').date()
+
+    def get_changelogs(self, tickets):
+        """
+        Fetch changelogs of given tickets concurrently
+
+        Returns list of (ticket, changelog) pairs in the original order,
+        tickets for which the changelog cannot be retrieved are skipped.
+        Messages already included in the search results are used
+        directly so that no additional request is needed.
+        """
+        def get_changelog(tck):
+            log.debug("ticket = {0}".format(tck))
+            if 'messages' in tck.ticket:
+                return tck.ticket
+            try:
+                return self.repo.get_changelog(tck)
+            except IOError:
+                log.debug('Failing to retrieve details for {0}'.format(
+                    tck.change_id))
+                return None
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            changelogs = list(executor.map(get_changelog, tickets))
+        return [
+            (tck, changes) for tck, changes in zip(tickets, changelogs)
+            if changes is not None]
 
     def fetch(self, query_string="", common_query_options=None,
-              limit_since=False):
+              limit_since=False, search_options=None):
         """
         Backend for the actual gerrit query.
 
@@ -153,6 +215,9 @@ class GerritUnit(Stats):
         limit_since:
             [optional] Boolean (defaults to False) post-process the
             results to eliminate items created after since option.
+        search_options:
+            [optional] list of additional fields to be included in the
+            search results, e.g. ['MESSAGES']
         """
         work_list = []
         log.info("Searching for changes by {0}".format(self.user))
@@ -188,19 +253,14 @@ class GerritUnit(Stats):
         log.debug('query_string = {0}'.format(query_string))
         log.debug('self.prefix = {0}'.format(self.prefix))
         log.debug('[fetch] self.base_url = {0}'.format(self.base_url))
-        work_list = self.repo.search(query_string)
+        work_list = self.repo.search(query_string, search_options)
 
         if limit_since:
-            tmplist = []
             log.debug('Limiting by since option')
             self.stats = []
-            for chg in work_list:
-                log.debug('chg = {0}'.format(chg))
-                chg_created = self.get_gerrit_date(chg['created'][:10])
-                log.debug('chg_created = {0}'.format(chg_created))
-                if chg_created >= self.since_date:
-                    tmplist.append(chg)
-            work_list = tmplist[:]
+            work_list = [
+                chg for chg in work_list
+                if self._parse_date(chg['created'][:10]) >= self.since_date]
         log.debug("work_list = {0}".format(work_list))
 
         # Return the list of tick_data objects
@@ -281,45 +341,35 @@ class AddedPatches(GerritUnit):
         log.info("Searching for patches added to changes by {0}".format(
             self.user))
         reviewer = self.user.login
-        self.stats = []
+        # The same change can be returned by multiple queries
+        changes_by_id = {}
         tickets = GerritUnit.fetch(
             self, 'owner:{0}+is:closed&q=owner:{0}+is:open'.format(
                 reviewer),
-            '')
-        for tck in tickets:
-            log.debug("ticket = {0}".format(tck))
-            try:
-                changes = self.repo.get_changelog(tck)
-            except IOError:
-                log.debug('Failing to retrieve details for {0}'.format(
-                    tck.change_id))
-                continue
-
+            '', search_options=CHANGELOG_OPTIONS)
+        for tck, changes in self.get_changelogs(tickets):
             owner = changes['owner']['email']
 
-            log.debug("changes.messages = {0}".format(
-                pretty(changes['messages'])))
+            if log.isEnabledFor(LOG_DEBUG):
+                log.debug("changes.messages = {0}".format(
+                    pretty(changes['messages'])))
             cmnts_by_user = []
             for chg in changes['messages']:
                 # TODO This is a very bad algorithm for recognising
                 # patch setts added by the owner of the change, but
                 # I don’t know how to find a list of all revisions for
                 # the particular change.
-                if 'author' not in chg:
-                    continue
-                if 'email' not in chg['author']:
-                    continue
-                comment_date = self.get_gerrit_date(chg['date'][:10])
-                if (owner == chg['author']['email'] and
-                        '_revision_number' in chg and
-                        chg['_revision_number'] > 1 and
-                        comment_date >= self.since_date and
-                        'uploaded patch' in chg['message'].lower()):
+                # Cheap checks go first, parse the date only if needed
+                if (chg.get('_revision_number', 0) > 1 and
+                        chg.get('author', {}).get('email') == owner and
+                        'uploaded patch' in chg['message'].lower() and
+                        self._parse_date(chg['date'][:10]) >= self.since_date):
                     cmnts_by_user.append(chg)
             if len(cmnts_by_user) > 0:
-                self.stats.append(
-                    Change(tck.ticket, changelog=changes,
-                           prefix=self.prefix))
+                if tck.id not in changes_by_id:
+                    changes_by_id[tck.id] = Change(
+                        tck.ticket, changelog=changes, prefix=self.prefix)
+        self.stats = list(changes_by_id.values())
         log.debug("self.stats = {0}".format(self.stats))
 
 
@@ -337,22 +387,17 @@ class ReviewedChanges(GerritUnit):
         # actual reviewer (not reviewer:<login> because that doesn’t
         # that the person actually did a review, only that it has
         # a right to do so).
-        self.stats = []
         reviewer = self.user.login
+        # The same change can be returned by multiple queries
+        changes_by_id = {}
         tickets = GerritUnit.fetch(
             self, 'reviewer:{0}+-owner:{0}'.format(
                 self.user.login),
-            '', limit_since=True)
-        for tck in tickets:
-            log.debug("ticket = {0}".format(tck))
-            try:
-                changes = self.repo.get_changelog(tck)
-            except IOError:
-                log.debug('Failing to retrieve details for {0}'.format(
-                    tck.change_id))
-                continue
-            log.debug("changes.messages = {0}".format(
-                pretty(changes['messages'])))
+            '', limit_since=True, search_options=CHANGELOG_OPTIONS)
+        for tck, changes in self.get_changelogs(tickets):
+            if log.isEnabledFor(LOG_DEBUG):
+                log.debug("changes.messages = {0}".format(
+                    pretty(changes['messages'])))
             cmnts_by_user = []
             for chg in changes['messages']:
                 if 'author' not in chg:
@@ -364,9 +409,10 @@ class ReviewedChanges(GerritUnit):
                     if comment_date >= self.since_date:
                         cmnts_by_user.append(chg)
             if len(cmnts_by_user) > 0:
-                self.stats.append(
-                    Change(tck.ticket, changelog=changes,
-                           prefix=self.prefix))
+                if tck.id not in changes_by_id:
+                    changes_by_id[tck.id] = Change(
+                        tck.ticket, changelog=changes, prefix=self.prefix)
+        self.stats = list(changes_by_id.values())
         log.debug("self.stats = {0}".format(self.stats))
 
 
@@ -20,12 +20,15 @@ once. Non git directories from the expansion are silently ignored.
 """
 
 import os
-import re
 import subprocess
+import tempfile
 
 import did.base
 from did.stats import Stats, StatsGroup
-from did.utils import item, log, pretty
+from did.utils import LOG_DEBUG, item, listed, log, pretty
+
+# Maximum number of repositories checked in parallel
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Git Repository
@@ -35,12 +38,58 @@ from did.utils import item, log, pretty
 class GitRepo(object):
     """ Git repository investigator """
 
+    # Repository investigators shared by path
+    _instances = {}
+
+    def __new__(cls, path):
+        """ Make sure we create a single instance per path only """
+        if path not in cls._instances:
+            instance = super(GitRepo, cls).__new__(cls)
+            instance._commits = {}
+            cls._instances[path] = instance
+        return cls._instances[path]
+
     def __init__(self, path):
         """ Initialize the path. """
         self.path = path
 
     def commits(self, user, options):
         """ List commits for given user. """
+        # Run git log only once for the same user and options
+        key = (user.login, str(options.since), str(options.until),
+               options.verbose)
+        if key not in self._commits:
+            if self._active(user, options):
+                self._commits[key] = self._log(user, options)
+            else:
+                self._commits[key] = []
+        return list(self._commits[key])
+
+    def _active(self, user, options):
+        """ Cheap check whether user has any commits in the interval """
+        command = [
+            "git", "rev-list", "--count", "--all",
+            "--author={0}".format(user.login),
+            "--since='{0} 00:00:00'".format(options.since),
+            "--until='{0} 00:00:00'".format(options.until)]
+        try:
+            process = subprocess.run(
+                command, cwd=self.path, encoding='utf-8',
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as error:
+            log.debug(error)
+            raise did.base.ReportError(
+                "Unable to access git repo '{0}'".format(self.path))
+        # Let git log handle (and report) any errors
+        if process.returncode != 0:
+            return True
+        count = int(process.stdout)
+        log.debug("Found {0} in {1}".format(
+            listed(count, "commit"), self.path))
+        return count > 0
+
+    def _log(self, user, options):
+        """ Run git log to get the commits for given user """
         # Prepare the command
         command = "git log --all --author={0}".format(user.login).split()
         command.append("--since='{0} 00:00:00'".format(options.since))
@@ -55,47 +104,64 @@ class GitRepo(object):
         log.info("Checking commits in {0}".format(self.path))
         log.details(pretty(command))
 
-        # Get the commit messages
+        # Get the commit messages (errors are collected in a file, a
+        # full stderr pipe would block git while we read the output)
+        errors = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
         try:
             process = subprocess.Popen(
                 command, cwd=self.path, encoding='utf-8',
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                stdout=subprocess.PIPE, stderr=errors)
         except OSError as error:
+            errors.close()
             log.debug(error)
             raise did.base.ReportError(
                 "Unable to access git repo '{0}'".format(self.path))
-        output, errors = process.communicate()
-        output = output.strip()
+        # Process the output line by line as it arrives
         log.debug("git log output:")
-        log.debug(output)
-        if process.returncode == 0:
-            if not output:
-                return []
-
+        debug = log.isEnabledFor(LOG_DEBUG)
+        commits = []
+        lines = []
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            if debug:
+                log.debug(line)
             # Single commit per line in non-verbose mode
             if not options.verbose:
-                return output.split("\n")
-
-            # In verbose mode commits separated by two empty lines
-            commits = []
-            for commit in re.split("\n\n+", output):
-                lines = commit.split("\n")
-
-                # Use a single line if no files changed (e.g. merges)
-                if len(lines) == 1:
-                    commits.append(lines[0])
-
-                # Show the first directory with modified files
-                # FIXME: But why just the first one? Shouldn't we show
-                # all? Or at least more? With a maximum limit?
-                else:
-                    directory = re.sub("/[^/]+$", "", lines[1])
-                    commits.append("{0}\n{1}* {2}".format(lines[0], 8 * " ", directory))
-            return commits
-        else:
-            log.debug(errors.strip())
+                if line:
+                    commits.append(line)
+            # In verbose mode commits separated by empty lines
+            elif line:
+                lines.append(line)
+            elif lines:
+                commits.append(self._verbose(lines))
+                lines = []
+        if lines:
+            commits.append(self._verbose(lines))
+        # Wait for the process to finish, collect errors
+        process.stdout.close()
+        process.wait()
+        with errors:
+            errors.seek(0)
+            message = errors.read().strip()
+        if process.returncode != 0:
+            log.debug(message)
             log.warning("Unable to check commits in '{0}'".format(self.path))
             return []
+        return commits
+
+    @staticmethod
+    def _verbose(lines):
+        """ Format verbose commit with the list of modified files """
+        # Use a single line if no files changed (e.g. merges)
+        if len(lines) == 1:
+            return lines[0]
+        # Show the first directory with modified files
+        # FIXME: But why just the first one? Shouldn't we show
+        # all? Or at least more? With a maximum limit?
+        directory, slash, name = lines[1].rpartition("/")
+        if not slash or not name:
+            directory = lines[1]
+        return f"{lines[0]}\n        * {directory}"
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -118,9 +184,7 @@ class GitCommits(Stats):
         """ Show summary header. """
         # A bit different header for git stats: Work on xxx: x commit(s)
         item(
-            "{0}: {1} commit{2}".format(
-                self.name, len(self.stats),
-                "" if len(self.stats) == 1 else "s"),
+            "{0}: {1}".format(self.name, listed(len(self.stats), "commit")),
             level=0, options=self.options)
 
 
@@ -134,6 +198,9 @@ class GitStats(StatsGroup):
     # Default order
     order = 300
 
+    # Repositories are checked in parallel
+    prefetch_workers = MAX_WORKERS
+
     def __init__(self, option, name=None, parent=None, user=None):
         name = "Work on {0}".format(option)
         StatsGroup.__init__(self, option, name, parent, user)
@@ -141,16 +208,16 @@ class GitStats(StatsGroup):
             path = os.path.expanduser(path)
             if path.endswith('/*'):
                 try:
-                    directories = os.listdir(path[:-1])
+                    # Entries know their file type, no extra stat needed
+                    with os.scandir(path[:-1]) as entries:
+                        directories = sorted(
+                            entry.name for entry in entries if entry.is_dir())
                 except OSError as error:
                     log.error(error)
                     raise did.base.ConfigError(
                         "Invalid path in the [{0}] section".format(option))
-                for repo_dir in sorted(directories):
+                for repo_dir in directories:
                     repo_path = path.replace('*', repo_dir)
-                    # Check directories only
-                    if not os.path.isdir(repo_path):
-                        continue
                     # Silently ignore non-git directories
                     if not os.path.exists(os.path.join(repo_path, ".git")):
                         log.debug("Skipping non-git directory '{0}'.".format(
@@ -164,3 +231,7 @@ class GitStats(StatsGroup):
                 self.stats.append(GitCommits(
                     option=option + "-" + repo, parent=self, path=path,
                     name="Work on {0}".format(repo)))
+
+    def prefetch(self, stat):
+        """ Run git log, results are picked up when checked """
+        stat.repo.commits(stat.user, stat.options)
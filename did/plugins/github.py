@@ -13,23 +13,38 @@ Config example::
 The authentication token is optional. However, unauthenticated
 queries are limited. For more details see `GitHub API`__ docs.
 Use ``login`` to override the default email address for searching.
+When the token is provided, searches of all enabled stats are sent
+together in a single GraphQL request.
 See the :doc:`config` documentation for details on using aliases.
 
 Alternatively to ``token`` you can use ``token_file`` to have the
 token stored in a file rather than in your did config file.
 
+Use the optional ``cache`` option to store fetched responses in the
+given file, for example ``cache = ~/.did/github-cache.json``. Repeated
+queries are then revalidated using ETags and unchanged results do not
+count against the API rate limit.
+
 __ https://docs.github.com/en/authentication/keeping-your-account-and-data-secure/creating-a-personal-access-token
 
 """  # noqa: W505,E501
 
+import hashlib
 import json
+import os
 import re
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 
 import requests
+from requests.adapters import HTTPAdapter, Retry
 
-from did.base import Config, Date, ReportError, get_token
+from did.base import Config, ReportError, get_token
 from did.stats import Stats, StatsGroup
-from did.utils import listed, log, pretty
+from did.utils import LOG_DATA, LOG_DEBUG, Cache, listed, log, pretty
 
 # Identifier padding
 PADDING = 3
@@ -37,6 +52,40 @@ PADDING = 3
 # Number of GH items to be fetched per page
 PER_PAGE = 100
 
+# Maximum number of requests sent in parallel (keep it low, GitHub has
+# secondary rate limits for concurrent requests)
+MAX_WORKERS = 4
+
+# Retry policy shared by all requests (connection errors and temporary
+# server failures, rate limits are handled separately)
+RETRY = Retry(
+    total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+    raise_on_status=False)
+
+# Owner, project and id of an issue from its api url
+RE_ISSUE_URL = re.compile(r"/repos/([^/]+)/([^/]+)/issues/(\d+)")
+
+# Maximum number of seconds to wait for the rate limit reset
+MAX_RATE_LIMIT_WAIT = 60
+
+# Number of seconds after which unused cached responses are dropped
+CACHE_EXPIRATION = 30 * 24 * 3600
+
+# Fields of issues and pull requests fetched by GraphQL search
+GRAPHQL_FIELDS = """
+    number title url comments { totalCount }
+    repository { name owner { login } }"""
+
+# Single search in the GraphQL query, {{ and }} are literal braces
+GRAPHQL_SEARCH = """
+    {alias}: search(query: {query}, type: ISSUE, first: {first}, after: {after}) {{
+        pageInfo {{ hasNextPage endCursor }}
+        nodes {{
+            ... on Issue {{ {fields} }}
+            ... on PullRequest {{ {fields} }}
+        }}
+    }}"""
+
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Investigator
@@ -45,8 +94,8 @@ PER_PAGE = 100
 class GitHub(object):
     """ GitHub Investigator """
 
-    def __init__(self, url, token):
-        """ Initialize url and headers """
+    def __init__(self, url, token=None, cache=None):
+        """ Initialize url, headers and response cache """
         self.url = url.rstrip("/")
         if token is not None:
             self.headers = {'Authorization': 'token {0}'.format(token)}
@@ -54,33 +103,90 @@ class GitHub(object):
             self.headers = {}
 
         self.token = token
+        # Reuse connections for all requests (including parallel ones)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS,
+            max_retries=RETRY)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # GitHub Enterprise uses /api/graphql instead of /api/v3
+        if self.url.endswith("/v3"):
+            self.graphql_url = self.url[:-3] + "/graphql"
+        else:
+            self.graphql_url = self.url + "/graphql"
+        # Search results already fetched during this run
+        self._search_cache = {}
+        # Responses visible to different tokens may differ
+        self._cache_prefix = hashlib.sha256(
+            (token or "").encode()).hexdigest()[:16]
+        self.cache = Cache(cache, "GitHub", revalidation=CACHE_EXPIRATION)
 
     @staticmethod
-    def until(until):
-        """ Issue #362: until for GH should have - delta(day=1) """
-        return until - 1
-
-    @staticmethod
-    def request_data(url, headers):
-        """ Fetch the URL from GitHub API and deserialize it to JSON """
+    def rate_limit_wait(response):
+        """ Seconds until the rate limit reset, None if not limited """
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return int(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = int(response.headers.get("X-RateLimit-Reset", 0))
+            return max(1, reset - int(time.time()) + 1)
+        return None
+
+    def get(self, url, headers=None):
+        """ Send the request, wait if the rate limit resets soon """
+        while True:
+            try:
+                response = self.session.get(url, headers=headers)
+                if log.isEnabledFor(LOG_DEBUG):
+                    log.debug(f"Response headers:\n{response.headers}")
+            except requests.exceptions.RequestException as error:
+                log.debug(error)
+                raise ReportError(f"GitHub failed to request URL {url}.")
+
+            # Check if credentials are valid
+            log.debug(f"GitHub status code: {response.status_code}")
+            if response.status_code == 401:
+                raise ReportError(
+                    "Defined token is not valid. "
+                    "Either update it or remove it.")
+
+            wait = self.rate_limit_wait(response)
+            if wait is None:
+                return response
+            if wait > MAX_RATE_LIMIT_WAIT:
+                raise ReportError(
+                    "GitHub API rate limit exceeded. "
+                    "Consider creating an access token.")
+            log.warning("GitHub API rate limit exceeded, waiting {0}.".format(
+                listed(wait, "second")))
+            time.sleep(wait)
+
+    def request_data(self, url, convert=None):
+        """
+        Fetch the URL from GitHub API, return data and links
+
+        Optional convert function is applied to successfully fetched
+        data before they are cached and returned.
+        """
         log.debug(f"GitHub URL: {url}")
-        try:
-            response = requests.get(url, headers=headers)
-            log.debug(f"Response headers:\n{response.headers}")
-        except requests.exceptions.RequestException as error:
-            log.debug(error)
-            raise ReportError(f"GitHub failed to request URL {url}.")
+        # Revalidate cached response, unchanged data are not sent again
+        key = f"{self._cache_prefix} {url}"
+        headers = self.cache.headers(key)
+        response = self.get(url, headers or None)
 
-        # Check if credentials are valid
-        log.debug(f"GitHub status code: {response.status_code}")
-        if response.status_code == 401:
-            raise ReportError(
-                "Defined token is not valid. "
-                "Either update it or remove it.")
+        # Use the cached data if nothing changed
+        if headers and response.status_code == 304:
+            log.debug("Using cached response")
+            cached = self.cache.revalidated(key)
+            return cached["data"], cached["links"]
 
         # Parse fetched json data
         try:
-            data = json.loads(response.text)
+            data = response.json()
         except requests.exceptions.JSONDecodeError as error:
             log.debug(error)
             raise ReportError(f"GitHub JSON failed: {response.text}.")
@@ -89,49 +195,148 @@ class GitHub(object):
             raise ReportError(
                 "GitHub API rate limit exceeded. "
                 "Consider creating an access token.")
-        return data, response
+        if convert is not None and response.status_code == 200:
+            data = convert(data)
+        if response.status_code == 200 and "ETag" in response.headers:
+            self.cache.store(
+                key, data, etag=response.headers["ETag"],
+                links=response.links)
+        return data, response.links
+
+    @staticmethod
+    def comment_data(comments):
+        """ Keep just creation date and author login of comments """
+        return [
+            (comment["created_at"][:10], (comment["user"] or {}).get("login"))
+            for comment in comments]
 
     def has_comments(self, issue_data, user, since, until):
         url = issue_data["comments_url"]
-        if not url:
+        # No need to walk the comments if there are none
+        if not url or issue_data.get("comments") == 0:
             return False
 
+        # Comments older than 'since' are filtered out by the server,
+        # so the walk starts directly at the first relevant page
         url = f"{url}?per_page={PER_PAGE}&sort=created&since={since}"
 
         while True:
-            comments, response = self.request_data(url, self.headers)
-            for comment in comments:
-                date = Date(comment["created_at"].split("T", 1)[0])
-                if date.date > until:
+            comments, links = self.request_data(url, self.comment_data)
+            for created, login in comments:
+                # Fixed format, no need for the generic Date parsing
+                if date.fromisoformat(created) > until:
                     return False
-                if user == comment["user"]["login"]:
+                if user == login:
                     return True
             # Update url to the next page, break if no next page
             # provided
-            if 'next' in response.links:
-                url = response.links['next']['url']
+            if 'next' in links:
+                url = links['next']['url']
             else:
                 break
         return False
 
+    def commented(self, issues, user, since, until):
+        """ Filter issues commented by user, check them in parallel """
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            found = list(executor.map(
+                lambda issue: self.has_comments(issue, user, since, until),
+                issues))
+        return [issue for issue, commented in zip(issues, found) if commented]
+
+    def issue_data(self, node):
+        """ Convert GraphQL search node into the REST API issue data """
+        url = "{0}/repos/{1}/{2}/issues/{3}".format(
+            self.url, node["repository"]["owner"]["login"],
+            node["repository"]["name"], node["number"])
+        return {
+            "url": url,
+            "html_url": node["url"],
+            "title": node["title"],
+            "comments_url": url + "/comments",
+            "comments": node["comments"]["totalCount"],
+            }
+
+    def prefetch(self, queries):
+        """ Perform multiple GitHub queries in one GraphQL request """
+        # GraphQL is available for authenticated requests only and
+        # revalidating cached REST responses is cheaper
+        if self.token is None or self.cache.path is not None:
+            return
+        urls = {}
+        pending = {}
+        for index, query in enumerate(queries):
+            url = self.url + "/" + query + f"&per_page={PER_PAGE}"
+            if url in self._search_cache:
+                continue
+            alias = f"search{index}"
+            urls[alias] = url
+            pending[alias] = (
+                urllib.parse.unquote_plus(query.partition("q=")[2]), None)
+        results = {alias: [] for alias in urls}
+
+        # Fetch the next page of all unfinished searches at once
+        while pending:
+            searches = "".join(
+                GRAPHQL_SEARCH.format(
+                    alias=alias, query=json.dumps(search),
+                    after=json.dumps(cursor), first=PER_PAGE,
+                    fields=GRAPHQL_FIELDS)
+                for alias, (search, cursor) in pending.items())
+            log.debug(f"GitHub GraphQL: {searches}")
+            try:
+                response = self.session.post(
+                    self.graphql_url, json={"query": f"{{{searches}\n}}"})
+                log.debug(f"GitHub status code: {response.status_code}")
+                data = response.json()
+                if response.status_code != 200 or data.get("errors"):
+                    raise ValueError(data.get("errors") or data)
+                data = data["data"]
+            except (requests.exceptions.RequestException, ValueError) as error:
+                # Searches are performed using the REST API instead
+                log.debug(error)
+                log.warning("GitHub GraphQL search failed, using REST API.")
+                return
+            for alias, (search, cursor) in list(pending.items()):
+                page = data[alias]
+                results[alias].extend(
+                    self.issue_data(node) for node in page["nodes"] if node)
+                if page["pageInfo"]["hasNextPage"]:
+                    pending[alias] = (search, page["pageInfo"]["endCursor"])
+                else:
+                    del pending[alias]
+
+        for alias, url in urls.items():
+            log.debug("Result: {0} fetched for {1}".format(
+                listed(len(results[alias]), "item"), url))
+            self._search_cache[url] = results[alias]
+
     def search(self, query):
         """ Perform GitHub query """
-        result = []
         url = self.url + "/" + query + f"&per_page={PER_PAGE}"
-
-        while True:
-            data, response = self.request_data(url, self.headers)
-            result.extend(data["items"])
-            # Update url to the next page, break if no next page
-            # provided
-            if 'next' in response.links:
-                url = response.links['next']['url']
-            else:
-                break
-
-        log.debug("Result: {0} fetched".format(listed(len(result), "item")))
-        log.data(pretty(result))
-        return result
+        if url in self._search_cache:
+            log.debug(f"Using already fetched results for {url}")
+            return list(self._search_cache[url])
+        data, links = self.request_data(url)
+        result = list(data["items"])
+
+        # All page urls are known from the first response, fetch the
+        # remaining pages in parallel
+        if 'last' in links:
+            last = urllib.parse.parse_qs(urllib.parse.urlsplit(
+                links['last']['url']).query)['page'][0]
+            urls = [f"{url}&page={page}" for page in range(2, int(last) + 1)]
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for data, _ in executor.map(self.request_data, urls):
+                    result.extend(data["items"])
+
+        if log.isEnabledFor(LOG_DEBUG):
+            log.debug("Result: {0} fetched".format(
+                listed(len(result), "item")))
+        if log.isEnabledFor(LOG_DATA):
+            log.data(pretty(result))
+        self._search_cache[url] = result
+        return list(result)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -141,26 +346,26 @@ class GitHub(object):
 class Issue(object):
     """ GitHub Issue """
 
+    __slots__ = ("data", "title", "owner", "project", "id", "options")
+
     def __init__(self, data, parent):
         self.data = data
         self.title = data["title"]
-        matched = re.search(
-            r"/repos/([^/]+)/([^/]+)/issues/(\d+)", data["url"])
-        self.owner = matched.groups()[0]
-        self.project = matched.groups()[1]
-        self.id = matched.groups()[2]
+        owner, project, self.id = RE_ISSUE_URL.search(data["url"]).groups()
+        # Just a few distinct owners and projects repeat across issues
+        self.owner = sys.intern(owner)
+        self.project = sys.intern(project)
         self.options = parent.options
 
     def __str__(self):
         """ String representation """
         if self.options.format == "markdown":
-            return "[{0}/{1}#{2}]({3}) - {4}".format(
-                self.owner, self.project,
-                str(self.id), self.data["html_url"], self.data["title"].strip())
-        else:
-            return "{0}/{1}#{2} - {3}".format(
-                self.owner, self.project,
-                str(self.id).zfill(PADDING), self.data["title"])
+            return (
+                f"[{self.owner}/{self.project}#{self.id}]"
+                f"({self.data['html_url']}) - {self.title.strip()}")
+        return (
+            f"{self.owner}/{self.project}#{self.id.zfill(PADDING)}"
+            f" - {self.title}")
 
     def __eq__(self, other):
         """ Equality comparison """
@@ -183,103 +388,119 @@ class Issue(object):
 class IssuesCreated(Stats):
     """ Issues created """
 
+    def query(self):
+        return "search/issues?q=author:{0}+created:{1}..{2}+type:issue".format(
+            self.user.login, self.options.since, self.parent.until)
+
     def fetch(self):
         log.info("Searching for issues created by {0}".format(self.user))
-        query = "search/issues?q=author:{0}+created:{1}..{2}".format(
-            self.user.login, self.options.since, GitHub.until(self.options.until))
-        query += "+type:issue"
         self.stats = [
-            Issue(issue, self.parent) for issue in self.parent.github.search(query)]
+            Issue(issue, self.parent)
+            for issue in self.parent.github.search(self.query())]
 
 
 class IssuesClosed(Stats):
     """ Issues closed """
 
+    def query(self):
+        return "search/issues?q=assignee:{0}+closed:{1}..{2}+type:issue".format(
+            self.user.login, self.options.since, self.parent.until)
+
     def fetch(self):
         log.info("Searching for issues closed by {0}".format(self.user))
-        query = "search/issues?q=assignee:{0}+closed:{1}..{2}".format(
-            self.user.login, self.options.since, GitHub.until(self.options.until))
-        query += "+type:issue"
         self.stats = [
-            Issue(issue, self.parent) for issue in self.parent.github.search(query)]
+            Issue(issue, self.parent)
+            for issue in self.parent.github.search(self.query())]
 
 
 class IssueCommented(Stats):
     """ Issues commented """
 
+    def query(self):
+        return "search/issues?q=commenter:{0}+updated:{1}..{2}+type:issue".format(
+            self.user.login, self.options.since, self.parent.until)
+
     def fetch(self):
         log.info("Searching for issues commented on by {0}".format(self.user))
         user = self.user.login
         since = self.options.since
-        until = GitHub.until(self.options.until)
-        query = "search/issues?q=commenter:{0}+updated:{1}..{2}".format(
-            user, since, until)
-        query += "+type:issue"
+        until = self.parent.until
         approx = getattr(
             self.options, f"{self.parent.option}_approximate_commented", False)
-        self.stats = [
-            Issue(issue, self.parent) for issue in self.parent.github.search(query)
-            # Additional filter for the comments by user in the interval
-            if approx or self.parent.github.has_comments(issue, user, since, until)]
+        issues = self.parent.github.search(self.query())
+        # Additional filter for the comments by user in the interval
+        if not approx:
+            issues = self.parent.github.commented(issues, user, since, until)
+        self.stats = [Issue(issue, self.parent) for issue in issues]
 
 
 class PullRequestsCreated(Stats):
     """ Pull requests created """
 
+    def query(self):
+        return "search/issues?q=author:{0}+created:{1}..{2}+type:pr".format(
+            self.user.login, self.options.since, self.parent.until)
+
     def fetch(self):
         log.info("Searching for pull requests created by {0}".format(
             self.user))
-        query = "search/issues?q=author:{0}+created:{1}..{2}".format(
-            self.user.login, self.options.since, GitHub.until(self.options.until))
-        query += "+type:pr"
         self.stats = [
-            Issue(issue, self.parent) for issue in self.parent.github.search(query)]
+            Issue(issue, self.parent)
+            for issue in self.parent.github.search(self.query())]
 
 
 class PullRequestsCommented(Stats):
     """ Pull requests commented """
 
+    def query(self):
+        return "search/issues?q=commenter:{0}+updated:{1}..{2}+type:pr".format(
+            self.user.login, self.options.since, self.parent.until)
+
     def fetch(self):
         log.info("Searching for pull requests commented on by {0}".format(
             self.user))
         user = self.user.login
         since = self.options.since
-        until = GitHub.until(self.options.until)
-        query = "search/issues?q=commenter:{0}+updated:{1}..{2}".format(
-            self.user.login, self.options.since, until)
-        query += "+type:pr"
+        until = self.parent.until
         approx = getattr(
             self.options, f"{self.parent.option}_approximate_commented", False)
-        self.stats = [
-            Issue(issue, self.parent) for issue in self.parent.github.search(query)
-            # Additional filter for the comments by user in the interval
-            if approx or self.parent.github.has_comments(issue, user, since, until)]
+        issues = self.parent.github.search(self.query())
+        # Additional filter for the comments by user in the interval
+        if not approx:
+            issues = self.parent.github.commented(issues, user, since, until)
+        self.stats = [Issue(issue, self.parent) for issue in issues]
 
 
 class PullRequestsClosed(Stats):
     """ Pull requests closed """
 
+    def query(self):
+        return "search/issues?q=assignee:{0}+closed:{1}..{2}+type:pr".format(
+            self.user.login, self.options.since, self.parent.until)
+
     def fetch(self):
         log.info("Searching for pull requests closed by {0}".format(
             self.user))
-        query = "search/issues?q=assignee:{0}+closed:{1}..{2}".format(
-            self.user.login, self.options.since, GitHub.until(self.options.until))
-        query += "+type:pr"
         self.stats = [
-            Issue(issue, self.parent) for issue in self.parent.github.search(query)]
+            Issue(issue, self.parent)
+            for issue in self.parent.github.search(self.query())]
 
 
 class PullRequestsReviewed(Stats):
     """ Pull requests reviewed """
 
+    def query(self):
+        return (
+            "search/issues?q=reviewed-by:{0}+-author:{0}+closed:{1}..{2}"
+            "+type:pr".format(
+                self.user.login, self.options.since, self.parent.until))
+
     def fetch(self):
         log.info("Searching for pull requests reviewed by {0}".format(
             self.user))
-        query = "search/issues?q=reviewed-by:{0}+-author:{0}+closed:{1}..{2}".format(
-            self.user.login, self.options.since, GitHub.until(self.options.until))
-        query += "+type:pr"
         self.stats = [
-            Issue(issue, self.parent) for issue in self.parent.github.search(query)]
+            Issue(issue, self.parent)
+            for issue in self.parent.github.search(self.query())]
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -303,7 +524,12 @@ class GitHubStats(StatsGroup):
                 "No github url set in the [{0}] section".format(option))
         # Check authorization token
         self.token = get_token(config)
-        self.github = GitHub(self.url, self.token)
+        cache = config.get("cache")
+        if cache is not None:
+            cache = os.path.expanduser(cache)
+        self.github = GitHub(self.url, self.token, cache)
+        # Issue #362: until for GH should have - delta(day=1)
+        self.until = self.options.until - 1 if self.options else None
         self.add_argument(
             f"--{option}-approximate-commented", action="store_true",
             help="If set, the filter to check if the user actually commented issues or "
@@ -332,3 +558,12 @@ class GitHubStats(StatsGroup):
                 option=option + "-pull-requests-reviewed", parent=self,
                 name="Pull requests reviewed on {0}".format(option)),
             ]
+
+    def check(self):
+        """ Check all stats and store fetched responses in the cache """
+        # Fetch all searches at once, stats then pick up the results
+        queries = [stat.query() for stat in self.stats if stat.enabled()]
+        if len(queries) > 1:
+            self.github.prefetch(queries)
+        super(GitHubStats, self).check()
+        self.github.cache.save()
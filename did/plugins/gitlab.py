@@ -24,26 +24,43 @@ __ https://docs.gitlab.com/ce/api/
 
 """
 
-from time import sleep
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 
-import dateutil
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
 from did.base import Config, ReportError, get_token
-from did.stats import Stats, StatsGroup
-from did.utils import listed, log, pretty, strtobool
+from did.stats import PREFETCH_WORKERS, Stats, StatsGroup
+from did.utils import LOG_DATA, listed, log, pretty, strtobool
 
 GITLAB_SSL_VERIFY = True
 GITLAB_API = 4
 
-# Retry fetching
+# Retry fetching (connection errors and temporary server failures)
 GITLAB_ATTEMPTS = 5
-GITLAB_INTERVAL = 5
+GITLAB_RETRY = Retry(
+    total=GITLAB_ATTEMPTS, backoff_factor=1.0,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(['GET']), raise_on_status=False)
 
 # Identifier padding
 PADDING = 3
 
+# Number of items fetched per page (maximum allowed by the api)
+PER_PAGE = 100
+
+# Maximum number of projects resolved by a single GraphQL query
+GRAPHQL_BATCH = 100
+
+# Maximum number of pages fetched in parallel
+MAX_WORKERS = 8
+
+# Size of the connection pool
+POOL_SIZE = 20
+
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Investigator
@@ -58,33 +75,32 @@ class GitLab(object):
         self.headers = {'PRIVATE-TOKEN': token}
         self.token = token
         self.ssl_verify = ssl_verify
+        # Keep connections alive across all api requests
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=GITLAB_RETRY)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Guard data shared by stats fetched in parallel
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._events_lock = threading.Lock()
         self.user = None
         self.events = None
+        self.events_by_key = None
+        self.users = {}
         self.projects = {}
         self.project_mrs = {}
         self.project_issues = {}
 
     def _get_gitlab_api_raw(self, url):
         log.debug("Connecting to GitLab API at '%s'.", url)
-        retries = 0
-        while True:
-            try:
-                api_raw = requests.get(
-                    url, headers=self.headers, verify=self.ssl_verify)
-                return api_raw
-            except requests.exceptions.ConnectionError as connection_error:
-                retries += 1
-                if retries > GITLAB_ATTEMPTS:
-                    raise ReportError(
-                        f"Unable to connect to '{url}'. Error: {connection_error}"
-                        ) from connection_error
-                log.debug(
-                    "Retrying connection to '%s' in %s seconds due to %s.",
-                    url,
-                    GITLAB_INTERVAL,
-                    connection_error
-                    )
-                sleep(GITLAB_INTERVAL)
+        try:
+            return self.session.get(url, verify=self.ssl_verify)
+        except requests.exceptions.ConnectionError as connection_error:
+            raise ReportError(
+                f"Unable to connect to '{url}'. Error: {connection_error}"
+                ) from connection_error
 
     def _get_gitlab_api(self, endpoint):
         url = '{0}/api/v{1}/{2}'.format(self.url, GITLAB_API, endpoint)
@@ -93,29 +109,55 @@ class GitLab(object):
     def _get_gitlab_api_json(self, endpoint):
         log.debug("Query: {0}".format(endpoint))
         result = self._get_gitlab_api(endpoint).json()
-        log.data(pretty(result))
+        if log.isEnabledFor(LOG_DATA):
+            log.data(pretty(result))
+        return result
+
+    @staticmethod
+    def _checked(result):
+        """ Make sure the page has been fetched successfully """
+        result.raise_for_status()
         return result
 
     def _get_gitlab_api_list(
             self, endpoint, since=None, get_all_results=False):
         results = []
-        result = self._get_gitlab_api(endpoint)
-        result.raise_for_status()
-        results.extend(result.json())
-        while ('next' in result.links and 'url' in result.links['next'] and
-                get_all_results):
-            result = self._get_gitlab_api_raw(result.links['next']['url'])
+        separator = "&" if "?" in endpoint else "?"
+        endpoint = f"{endpoint}{separator}per_page={PER_PAGE}"
+        result = self._checked(self._get_gitlab_api(endpoint))
+        # Fetch remaining pages in parallel if their count is known
+        # (not provided by the server for very large lists)
+        pages = result.headers.get('x-total-pages', '')
+        if get_all_results and pages.isdigit() and int(pages) > 1:
+            results.extend(result.json())
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for page in executor.map(
+                        lambda page: self._checked(self._get_gitlab_api(
+                            f"{endpoint}&page={page}")).json(),
+                        range(2, int(pages) + 1)):
+                    results.extend(page)
+            return results
+        # Otherwise follow the next page links
+        while True:
             json_result = result.json()
             results.extend(json_result)
-            if since is not None:
-                # check if the last result is older than the since date
-                created_at = dateutil.parser.parse(
-                    json_result[-1]['created_at']).date()
+            if not (get_all_results and 'url' in result.links.get('next', {})):
+                return results
+            # No need to fetch the next page if the last result (already
+            # including the first page) is older than the since date
+            if since is not None and json_result:
+                created_at = date.fromisoformat(
+                    json_result[-1]['created_at'][:10])
                 if created_at < since.date:
                     return results
-        return results
+            result = self._checked(
+                self._get_gitlab_api_raw(result.links['next']['url']))
 
     def get_user(self, username):
+        return self._cached(
+            self.users, username, lambda: self._get_user(username))
+
+    def _get_user(self, username):
         query = 'users?username={0}'.format(username)
         try:
             result = self._get_gitlab_api_json(query)
@@ -129,35 +171,81 @@ class GitLab(object):
             raise ReportError(
                 "Unable to find user '{0}' on GitLab.".format(username))
 
+    def _cached(self, cache, key, fetch):
+        """ Fetch the value once, even if requested by more threads """
+        with self._lock:
+            lock = self._locks.setdefault((id(cache), key), threading.Lock())
+        with lock:
+            if key not in cache:
+                cache[key] = fetch()
+        return cache[key]
+
     def get_project(self, project_id):
-        if project_id not in self.projects:
-            query = 'projects/{0}'.format(project_id)
-            self.projects[project_id] = self._get_gitlab_api_json(query)
-        return self.projects[project_id]
-
-    def get_project_mr(self, project_id, mr_id):
-        mrs = self.get_project_mrs(project_id)
-        mr = next(filter(lambda x: x['id'] == mr_id, mrs), None)
-        return mr
-
-    def get_project_mrs(self, project_id):
-        if project_id not in self.project_mrs:
-            query = 'projects/{0}/merge_requests'.format(project_id)
-            self.project_mrs[project_id] = self._get_gitlab_api_list(
-                query, get_all_results=True)
-        return self.project_mrs[project_id]
-
-    def get_project_issue(self, project_id, issue_id):
-        issues = self.get_project_issues(project_id)
-        issue = next(filter(lambda x: x['id'] == issue_id, issues), None)
-        return issue
-
-    def get_project_issues(self, project_id):
-        if project_id not in self.project_issues:
-            query = 'projects/{0}/issues'.format(project_id)
-            self.project_issues[project_id] = self._get_gitlab_api_list(
-                query, get_all_results=True)
-        return self.project_issues[project_id]
+        query = 'projects/{0}'.format(project_id)
+        return self._cached(
+            self.projects, project_id,
+            lambda: self._get_gitlab_api_json(query))
+
+    def prefetch_projects(self, project_ids):
+        """ Resolve paths of given projects using GraphQL queries """
+        project_ids = sorted(set(project_ids) - set(self.projects))
+        for start in range(0, len(project_ids), GRAPHQL_BATCH):
+            ids = ", ".join(
+                '"gid://gitlab/Project/{0}"'.format(project_id)
+                for project_id in project_ids[start:start + GRAPHQL_BATCH])
+            query = "{ projects(ids: [%s], first: %d) { nodes { id fullPath } } }"
+            try:
+                response = self.session.post(
+                    '{0}/api/graphql'.format(self.url),
+                    json={"query": query % (ids, GRAPHQL_BATCH)},
+                    headers={'Authorization': 'Bearer {0}'.format(self.token)},
+                    verify=self.ssl_verify)
+                response.raise_for_status()
+                nodes = response.json()["data"]["projects"]["nodes"]
+            except (requests.exceptions.RequestException, ValueError,
+                    KeyError, TypeError) as error:
+                # Projects will be fetched one by one using the rest api
+                log.debug("Unable to prefetch projects: {0}".format(error))
+                return
+            for node in nodes:
+                project_id = int(node["id"].rpartition("/")[2])
+                self.projects[project_id] = {
+                    "id": project_id, "path_with_namespace": node["fullPath"]}
+
+    def _get_project_item(self, cache, kind, project_id, item_id, since):
+        """ Find project item by id, updated since given date first """
+        item = self._get_project_list(cache, kind, project_id, since).get(
+            item_id)
+        # Not updated since given date? Check all items then.
+        if item is None and since is not None:
+            item = self._get_project_list(cache, kind, project_id).get(item_id)
+        return item
+
+    def _get_project_list(self, cache, kind, project_id, since=None):
+        """ Project items (updated since date) indexed by their id """
+        query = 'projects/{0}/{1}'.format(project_id, kind)
+        if since is not None:
+            query += '?updated_after={0}'.format(since)
+        return self._cached(
+            cache, (project_id, str(since)),
+            lambda: {item['id']: item for item in self._get_gitlab_api_list(
+                query, get_all_results=True)})
+
+    def get_project_mr(self, project_id, mr_id, since=None):
+        return self._get_project_item(
+            self.project_mrs, 'merge_requests', project_id, mr_id, since)
+
+    def get_project_mrs(self, project_id, since=None):
+        return self._get_project_list(
+            self.project_mrs, 'merge_requests', project_id, since)
+
+    def get_project_issue(self, project_id, issue_id, since=None):
+        return self._get_project_item(
+            self.project_issues, 'issues', project_id, issue_id, since)
+
+    def get_project_issues(self, project_id, since=None):
+        return self._get_project_list(
+            self.project_issues, 'issues', project_id, since)
 
     def user_events(self, user_id, since, until):
         if GITLAB_API >= 4:
@@ -169,17 +257,27 @@ class GitLab(object):
 
     def search(self, user, since, until, target_type, action_name):
         """ Perform GitLab query """
-        if not self.user:
-            self.user = self.get_user(user)
-        if self.events is None:
-            self.events = self.user_events(self.user['id'], since, until)
-        result = []
-        for event in self.events:
-            created_at = dateutil.parser.parse(event['created_at']).date()
-            if (event['target_type'] == target_type and
-                    event['action_name'] == action_name and
-                    since.date <= created_at and until.date >= created_at):
-                result.append(event)
+        with self._events_lock:
+            if not self.user:
+                self.user = self.get_user(user)
+            if self.events is None:
+                self.events = self.user_events(self.user['id'], since, until)
+                self.prefetch_projects(
+                    event['project_id'] for event in self.events
+                    if event['target_type'] in ('Issue', 'MergeRequest', 'Note'))
+                # Group events by type and action (with parsed dates,
+                # timestamps have a fixed format, the date comes first)
+                self.events_by_key = {}
+                for event in self.events:
+                    key = (event['target_type'], event['action_name'])
+                    created_at = date.fromisoformat(event['created_at'][:10])
+                    self.events_by_key.setdefault(key, []).append(
+                        (created_at, event))
+        since, until = since.date, until.date
+        result = [
+            event for created_at, event
+            in self.events_by_key.get((target_type, action_name), [])
+            if since <= created_at <= until]
         log.debug("Result: {0} fetched".format(listed(len(result), "item")))
         return result
 
@@ -198,45 +296,58 @@ class Issue(object):
         self.project = self.gitlabapi.get_project(data['project_id'])
         self.id = self.iid()
         self.title = data['target_title']
+        self.path = self.project['path_with_namespace']
+        if data['target_type'] == 'Issue' or (
+                data['target_type'] == 'Note'
+                and data['note']['noteable_type'] == 'Issue'):
+            self.endpoint = "issues"
+        else:
+            self.endpoint = "merge_requests"
+        self._string = None
 
     def iid(self):
+        # Recent GitLab versions provide the iid in the event directly
+        if self.data.get('target_iid') is not None:
+            return self.data['target_iid']
         return self.gitlabapi.get_project_issue(
-            self.data['project_id'], self.data['target_id'])['iid']
+            self.data['project_id'], self.data['target_id'],
+            self.parent.options.since)['iid']
 
     def __str__(self):
         """ String representation """
+        # Format does not change during the report, build it just once
+        if self._string is not None:
+            return self._string
         if self.parent.options.format == "markdown":
-            endpoint = "merge_requests"
-            if self.data['target_type'] == 'Issue' or (
-                    self.data['target_type'] == 'Note'
-                    and self.data['note']['noteable_type'] == 'Issue'
-                    ):
-                endpoint = "issues"
-            return "[{1}#{3}]({0}/{1}/-/{2}/{3}) - {4}".format(
-                self.gitlabapi.url,
-                self.project['path_with_namespace'],
-                endpoint,
-                str(self.id), self.title)
+            self._string = "[{1}#{3}]({0}/{1}/-/{2}/{3}) - {4}".format(
+                self.gitlabapi.url, self.path, self.endpoint,
+                self.id, self.title)
         else:
-            return "{0}#{1} - {2}".format(
-                self.project['path_with_namespace'],
-                str(self.id).zfill(PADDING), self.title)
+            self._string = "{0}#{1} - {2}".format(
+                self.path, str(self.id).zfill(PADDING), self.title)
+        return self._string
 
 
 class MergeRequest(Issue):
 
     def iid(self):
+        if self.data.get('target_iid') is not None:
+            return self.data['target_iid']
         return self.gitlabapi.get_project_mr(
-            self.data['project_id'], self.data['target_id'])['iid']
+            self.data['project_id'], self.data['target_id'],
+            self.parent.options.since)['iid']
 
 
 class Note(Issue):
 
     def iid(self):
+        if self.data['note'].get('noteable_iid') is not None:
+            return self.data['note']['noteable_iid']
         if self.data['note']['noteable_type'] == 'Issue':
             issue = self.gitlabapi.get_project_issue(
                 self.data['project_id'],
-                self.data['note']['noteable_id'])
+                self.data['note']['noteable_id'],
+                self.parent.options.since)
 
             # `noteable_type` is `Issue` even for `WorkItem`s, which
             # aren't returned by `get_project_issue()`
@@ -246,7 +357,8 @@ class Note(Issue):
         elif self.data['note']['noteable_type'] == 'MergeRequest':
             return self.gitlabapi.get_project_mr(
                 self.data['project_id'],
-                self.data['note']['noteable_id'])['iid']
+                self.data['note']['noteable_id'],
+                self.parent.options.since)['iid']
         else:
             return "unknown"
 
@@ -365,6 +477,9 @@ class GitLabStats(StatsGroup):
     # Default order
     order = 380
 
+    # Stats are fetched in parallel
+    prefetch_workers = PREFETCH_WORKERS
+
     def __init__(self, option, name=None, parent=None, user=None):
         StatsGroup.__init__(self, option, name, parent, user)
         config = dict(Config().section(option))
@@ -76,33 +76,59 @@ Notes:
   Its value is ignored for ``token`` auth_type.
 * The ``auth_type`` parameter is optional, default value is ``gss``.
   Other values are ``basic`` and ``token``.
+* Optional parameter ``cache`` can be used to store fetched search
+  results in the given file, e.g. ``cache = ~/.did/jira-cache.json``.
+  Results for periods which ended more than a week ago are reused for
+  a month, recent results are refreshed after an hour. Expired results
+  are revalidated using ETags so that unchanged data are not sent again.
+* Optional parameter ``page_size`` sets the number of issues fetched
+  in a single request (default: 1000). If the server allows fewer
+  results per request, the page size is lowered accordingly.
+* Optional parameter ``workers`` sets how many batches of search
+  results are fetched in parallel (default: 5).
 """
 
+import datetime
+import hashlib
+import json
+import math
 import os
-import re
-import urllib.parse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-import dateutil.parser
 import requests
+from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 from requests_gssapi import DISABLED, HTTPSPNEGOAuth
 
 from did.base import Config, ReportError, get_token
-from did.stats import Stats, StatsGroup
-from did.utils import listed, log, pretty, strtobool
+from did.stats import PREFETCH_WORKERS, Stats, StatsGroup
+from did.utils import LOG_DATA, Cache, listed, log, pretty, strtobool
 
-# Maximum number of results fetched at once
+# Default number of results fetched at once
 MAX_RESULTS = 1000
 
 # Maximum number of batches
 MAX_BATCHES = 100
 
+# Number of batches fetched in parallel
+MAX_WORKERS = 5
+
 # Supported authentication types
 AUTH_TYPES = ["gss", "basic", "token"]
 
 # Enable ssl verify
 SSL_VERIFY = True
 
+# Number of seconds cached results of finished periods are valid
+CACHE_EXPIRATION = 30 * 24 * 3600
+
+# Number of seconds cached results of recent periods are valid
+CACHE_EXPIRATION_RECENT = 3600
+
+# Periods which ended at least this long ago are considered finished
+CACHE_FINISHED = datetime.timedelta(days=7)
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Issue Investigator
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -111,22 +137,32 @@ SSL_VERIFY = True
 class Issue(object):
     """ Jira issue investigator """
 
+    __slots__ = (
+        "parent", "options", "key", "summary", "commented",
+        "identifier", "prefix")
+
+    # Search batches fetched during this run, shared by all sections
+    _batches = {}
+
     def __init__(self, issue=None, parent=None):
         """ Initialize issue """
         if issue is None:
             return
         self.parent = parent
         self.options = parent.options
-        self.issue = issue
         self.key = issue["key"]
         self.summary = issue["fields"]["summary"]
-        self.comments = issue["fields"]["comment"]["comments"]
-        matched = re.match(r"(\w+)-(\d+)", self.key)
-        self.identifier = matched.groups()[1]
+        # Keep just author email and date of each comment
+        comments = issue["fields"].get("comment", {}).get("comments", [])
+        self.commented = [
+            ((comment.get("author") or {}).get("emailAddress"),
+             datetime.date.fromisoformat(comment["created"][:10]))
+            for comment in comments]
+        prefix, self.identifier = self.key.rsplit("-", 1)
         if parent.prefix is not None:
             self.prefix = parent.prefix
         else:
-            self.prefix = matched.groups()[0]
+            self.prefix = prefix
 
     def __str__(self):
         """ Jira key and summary for displaying """
@@ -134,7 +170,7 @@ class Issue(object):
             return "[{0}-{1}]({2}) - {3}".format(
                 self.prefix,
                 self.identifier,
-                f"{self.parent.url}/browse/{self.issue['key']}",
+                f"{self.parent.url}/browse/{self.key}",
                 self.summary
                 )
         return "{0}-{1} - {2}".format(
@@ -144,20 +180,41 @@ class Issue(object):
         """ Compare issues by key """
         return self.key == other.key
 
+    def __hash__(self):
+        """ Hash issues by key so that they can be used in sets """
+        return hash(self.key)
+
     @staticmethod
-    def search(query, stats):
-        """ Perform issue search for given stats instance """
-        log.debug("Search query: {0}".format(query))
-        issues = []
-        # Fetch data from the server in batches of MAX_RESULTS issues
-        for batch in range(MAX_BATCHES):
-            response = stats.parent.session.get(
-                "{0}/rest/api/latest/search?{1}".format(
-                    stats.parent.url, urllib.parse.urlencode({
-                        "jql": query,
-                        "fields": "summary,comment",
-                        "maxResults": MAX_RESULTS,
-                        "startAt": batch * MAX_RESULTS})))
+    def fetch_batch(query, stats, batch, fields="summary"):
+        """ Fetch a single batch of issues matching given query """
+        # Send the query in the body, long queries do not fit into url
+        url = "{0}/rest/api/latest/search".format(stats.parent.url)
+        body = {
+            "jql": query,
+            "fields": fields.split(","),
+            "maxResults": stats.parent.page_size,
+            "startAt": batch * stats.parent.page_size}
+        # Results visible to different accounts may differ
+        key = "{0} {1} {2}".format(
+            stats.parent.account, url, json.dumps(body, sort_keys=True))
+        if key in Issue._batches:
+            log.debug("Batch {0} result: already fetched".format(batch))
+            return Issue._batches[key]
+        cache = stats.parent.cache
+        cached = cache.fresh(key)
+        if cached:
+            log.debug("Batch {0} result: using cached response".format(batch))
+            Issue._batches[key] = cached["data"]
+            return cached["data"]
+        # Revalidate expired results, unchanged data are not sent again
+        headers = cache.headers(key)
+        response = stats.parent.session.post(
+            url, json=body, headers=headers or None)
+        if headers and response.status_code == 304:
+            log.debug("Batch {0} result: not modified".format(batch))
+            data = cache.revalidated(
+                key, stats.parent.cache_expiration)["data"]
+        else:
             data = response.json()
             if not response.ok:
                 try:
@@ -170,11 +227,38 @@ class Issue(object):
                     f"and the error was '{error}'.")
             log.debug("Batch {0} result: {1} fetched".format(
                 batch, listed(data["issues"], "issue")))
-            log.data(pretty(data))
-            issues.extend(data["issues"])
-            # If all issues fetched, we're done
-            if len(issues) >= data["total"]:
-                break
+            if log.isEnabledFor(LOG_DATA):
+                log.data(pretty(data))
+            cache.store(
+                key, data, etag=response.headers.get("ETag"),
+                expiration=stats.parent.cache_expiration)
+        Issue._batches[key] = data
+        return data
+
+    @staticmethod
+    def search(query, stats, fields="summary"):
+        """ Perform issue search for given stats instance """
+        log.debug("Search query: {0}".format(query))
+        # The first batch tells us how many issues there are in total
+        data = Issue.fetch_batch(query, stats, 0, fields)
+        issues = list(data["issues"])
+        # Server may limit the number of results, adjust the page size
+        if 0 < data["maxResults"] < stats.parent.page_size:
+            log.warning(
+                "Jira page size {0} limited by the server to {1}.".format(
+                    stats.parent.page_size, data["maxResults"]))
+            stats.parent.page_size = data["maxResults"]
+        batches = min(
+            MAX_BATCHES, math.ceil(data["total"] / stats.parent.page_size))
+        # Fetch remaining batches in parallel
+        if batches > 1:
+            with ThreadPoolExecutor(
+                    max_workers=stats.parent.workers) as executor:
+                for data in executor.map(
+                        lambda batch: Issue.fetch_batch(
+                            query, stats, batch, fields),
+                        range(1, batches)):
+                    issues.extend(data["issues"])
         # Return the list of issue objects
         return [
             Issue(issue, parent=stats.parent)
@@ -183,16 +267,10 @@ class Issue(object):
 
     def updated(self, user, options):
         """ True if the issue was commented by given user """
-        for comment in self.comments:
-            created = dateutil.parser.parse(comment["created"]).date()
-            try:
-                if (comment["author"]["emailAddress"] == user.email and
-                        created >= options.since.date and
-                        created < options.until.date):
-                    return True
-            except KeyError:
-                pass
-        return False
+        return any(
+            email == user.email and
+            options.since.date <= created < options.until.date
+            for email, created in self.commented)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -239,7 +317,8 @@ class JiraUpdated(Stats):
                     self.options.until))
             # Filter only issues commented by given user
             self.stats = [
-                issue for issue in Issue.search(query, stats=self)
+                issue for issue in Issue.search(
+                    query, stats=self, fields="summary,comment")
                 if issue.updated(self.user, self.options)]
 
 
@@ -270,6 +349,13 @@ class JiraStats(StatsGroup):
     # Default order
     order = 600
 
+    # Stats are fetched in parallel
+    prefetch_workers = PREFETCH_WORKERS
+
+    # Authenticated sessions shared by server and credentials
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+
     def __init__(self, option, name=None, parent=None, user=None):
         StatsGroup.__init__(self, option, name, parent, user)
         self._session = None
@@ -365,9 +451,36 @@ class JiraStats(StatsGroup):
                 "When scriptrunner is disabled with 'use_scriptrunner=False', "
                 "'project' has to be defined for each JIRA section.")
         self.login = config.get("login", None)
+        # Number of results fetched at once
+        try:
+            self.page_size = int(config.get("page_size", MAX_RESULTS))
+        except ValueError:
+            raise ReportError(
+                "The ``page_size`` must contain number, used in "
+                "[{0}] section.".format(option))
+        if self.page_size <= 0:
+            raise ReportError(
+                "The ``page_size`` must be a positive number, used in "
+                "[{0}] section.".format(option))
+        # Number of parallel batch requests
+        try:
+            self.workers = int(config.get("workers", MAX_WORKERS))
+        except ValueError:
+            raise ReportError(
+                "The ``workers`` must contain number, used in "
+                "[{0}] section.".format(option))
+        if self.workers <= 0:
+            raise ReportError(
+                "The ``workers`` must be a positive number, used in "
+                "[{0}] section.".format(option))
 
         # Check for custom prefix
         self.prefix = config["prefix"] if "prefix" in config else None
+        # Optional cache of search results
+        cache = config.get("cache")
+        self.cache = Cache(
+            os.path.expanduser(cache) if cache else None, "Jira",
+            revalidation=CACHE_EXPIRATION)
         # Create the list of stats
         self.stats = [
             JiraCreated(
@@ -381,60 +494,105 @@ class JiraStats(StatsGroup):
                 name="Issues resolved in {0}".format(option)),
             ]
 
+    @property
+    def cache_expiration(self):
+        """ Number of seconds new cached results are valid """
+        finished = datetime.date.today() - CACHE_FINISHED
+        if self.options.until.date < finished:
+            return CACHE_EXPIRATION
+        return CACHE_EXPIRATION_RECENT
+
+    def check(self):
+        """ Check all stats, save the cache afterwards """
+        super(JiraStats, self).check()
+        self.cache.save()
+
+    @property
+    def session_key(self):
+        """ Server and credentials identifying the session """
+        if self.auth_type == "token":
+            credentials = self.token
+        elif self.auth_type == "basic":
+            credentials = self.auth_username
+        else:
+            credentials = None
+        return (self.url, self.auth_url, self.auth_type, credentials,
+                self.ssl_verify)
+
+    @property
+    def account(self):
+        """ Hash of the session key, safe to be stored in the cache """
+        return hashlib.sha256(
+            repr(self.session_key).encode()).hexdigest()[:16]
+
     @property
     def session(self):
         """ Initialize the session """
         if self._session is None:
-            self._session = requests.Session()
-            log.debug("Connecting to {0}".format(self.auth_url))
-            # Disable SSL warning when ssl_verify is False
-            if not self.ssl_verify:
-                requests.packages.urllib3.disable_warnings(
-                    InsecureRequestWarning)
-            if self.auth_type == 'basic':
-                basic_auth = (self.auth_username, self.auth_password)
-                response = self._session.get(
-                    self.auth_url, auth=basic_auth, verify=self.ssl_verify)
-            elif self.auth_type == "token":
-                self.session.headers["Authorization"] = f"Bearer {self.token}"
-                response = self._session.get(
-                    "{0}/rest/api/2/myself".format(self.url),
-                    verify=self.ssl_verify)
-            else:
-                gssapi_auth = HTTPSPNEGOAuth(mutual_authentication=DISABLED)
-                response = self._session.get(
-                    self.auth_url, auth=gssapi_auth, verify=self.ssl_verify)
+            # Share sessions for the same server and credentials
+            key = self.session_key
+            with JiraStats._sessions_lock:
+                if key not in JiraStats._sessions:
+                    JiraStats._sessions[key] = self.connect()
+            self._session = JiraStats._sessions[key]
+        return self._session
+
+    def connect(self):
+        """ Create a new authenticated session """
+        session = requests.Session()
+        # Keep a connection for each parallel request of all stats
+        adapter = HTTPAdapter(pool_maxsize=len(self.stats) * self.workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        log.debug("Connecting to {0}".format(self.auth_url))
+        # Disable SSL warning when ssl_verify is False
+        if not self.ssl_verify:
+            requests.packages.urllib3.disable_warnings(
+                InsecureRequestWarning)
+        if self.auth_type == 'basic':
+            basic_auth = (self.auth_username, self.auth_password)
+            response = session.get(
+                self.auth_url, auth=basic_auth, verify=self.ssl_verify)
+        elif self.auth_type == "token":
+            session.headers["Authorization"] = f"Bearer {self.token}"
+            response = session.get(
+                "{0}/rest/api/2/myself".format(self.url),
+                verify=self.ssl_verify)
+        else:
+            gssapi_auth = HTTPSPNEGOAuth(mutual_authentication=DISABLED)
+            response = session.get(
+                self.auth_url, auth=gssapi_auth, verify=self.ssl_verify)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as error:
+            log.error(error)
+            raise ReportError(
+                "Jira authentication failed. Check credentials or kinit.")
+        if self.auth_type == "token" and self.token_expiration:
+            response = session.get(
+                "{0}/rest/pat/latest/tokens".format(self.url),
+                verify=self.ssl_verify)
             try:
                 response.raise_for_status()
-            except requests.exceptions.HTTPError as error:
-                log.error(error)
-                raise ReportError(
-                    "Jira authentication failed. Check credentials or kinit.")
-            if self.token_expiration:
-                response = self._session.get(
-                    "{0}/rest/pat/latest/tokens".format(self.url),
-                    verify=self.ssl_verify)
-                try:
-                    response.raise_for_status()
-                    token_found = None
-                    for token in response.json():
-                        if token["name"] == self.token_name:
-                            token_found = token
-                            break
-                    if token_found is None:
-                        raise ValueError(
-                            f"Can't check validity for the '{self.token_name}' "
-                            f"token as it doesn't exist.")
-                    from datetime import datetime
-                    expiring_at = datetime.strptime(
-                        token_found["expiringAt"], r"%Y-%m-%dT%H:%M:%S.%f%z")
-                    delta = (
-                        expiring_at.astimezone() - datetime.now().astimezone())
-                    if delta.days < self.token_expiration:
-                        log.warning(
-                            f"Jira token '{self.token_name}' "
-                            f"expires in {delta.days} days.")
-                except (requests.exceptions.HTTPError,
-                        KeyError, ValueError) as error:
-                    log.warning(error)
-        return self._session
+                token_found = None
+                for token in response.json():
+                    if token["name"] == self.token_name:
+                        token_found = token
+                        break
+                if token_found is None:
+                    raise ValueError(
+                        f"Can't check validity for the '{self.token_name}' "
+                        f"token as it doesn't exist.")
+                expiring_at = datetime.datetime.strptime(
+                    token_found["expiringAt"], r"%Y-%m-%dT%H:%M:%S.%f%z")
+                delta = (
+                    expiring_at.astimezone()
+                    - datetime.datetime.now().astimezone())
+                if delta.days < self.token_expiration:
+                    log.warning(
+                        f"Jira token '{self.token_name}' "
+                        f"expires in {delta.days} days.")
+            except (requests.exceptions.HTTPError,
+                    KeyError, ValueError) as error:
+                log.warning(error)
+        return session
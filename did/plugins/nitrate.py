@@ -49,7 +49,7 @@ class AutomatedCases(Stats):
     def fetch(self):
         self.stats = [
             case for case in self.parent.cases
-            if case.automated and case not in self.parent.copies]
+            if case.automated and case.id not in self.parent.copy_ids]
 
 
 class AutoproposedCases(Stats):
@@ -59,7 +59,7 @@ class AutoproposedCases(Stats):
         self.stats = [
             case for case in self.parent.cases
             if case.autoproposed and not case.automated and
-            case not in self.parent.copies]
+            case.id not in self.parent.copy_ids]
 
 
 class ManualCases(Stats):
@@ -68,7 +68,7 @@ class ManualCases(Stats):
     def fetch(self):
         self.stats = [
             case for case in self.parent.cases
-            if not case.automated and case not in self.parent.copies]
+            if not case.automated and case.id not in self.parent.copy_ids]
 
 
 class CopiedCases(Stats):
@@ -90,7 +90,7 @@ class NitrateStats(StatsGroup):
 
     def __init__(self, option, name=None, parent=None, user=None):
         StatsGroup.__init__(self, option, name, parent, user)
-        self._cases = self._copies = None
+        self._cases = self._copies = self._copy_ids = None
         self.stats = [
             TestPlans(option=option + "-plans", parent=self),
             TestRuns(option=option + "-runs", parent=self),
@@ -127,3 +127,10 @@ class NitrateStats(StatsGroup):
                     create_date__lt=str(self.options.until),
                     tag__name=TEST_CASE_COPY_TAG)]
         return self._copies
+
+    @property
+    def copy_ids(self):
+        """ Identifiers of all test case copies created by the user """
+        if self._copy_ids is None:
+            self._copy_ids = set(case.id for case in self.copies)
+        return self._copy_ids
@@ -9,16 +9,20 @@ Config example::
     url = https://redmine.example.com/
     login = <user_db_id>
     activity_days = 30
+    feeds_limit = 15
 
 Use ``login`` to set the database user id in Redmine (number not login
 name).  See the :doc:`config` docs for details on using aliases.  Use
 ``activity_days`` to override the default 30 days of activity paging,
 this has to match to the server side setting, otherwise the plugin will
-miss entries.
+miss entries. Similarly, ``feeds_limit`` should match the maximum
+number of entries in a feed set on the server (default 15). When a
+feed is full, the rest of its window is fetched separately.
 
 """
 
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import dateutil
 import feedparser
@@ -27,6 +31,13 @@ from did.base import Config, ReportError
 from did.stats import Stats, StatsGroup
 from did.utils import log
 
+# Maximum number of activity feeds fetched in parallel
+MAX_WORKERS = 8
+
+# Server defaults of activity_days_default and feeds_limit
+ACTIVITY_DAYS = 30
+FEEDS_LIMIT = 15
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Activity
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -51,23 +62,59 @@ class Activity(object):
 class RedmineActivity(Stats):
     """ Redmine Activity Stats """
 
-    def fetch(self):
-        log.info("Searching for activity by {0}".format(self.user))
-        results = []
+    @staticmethod
+    def updated(entry):
+        """ Date of the last entry update """
+        return dateutil.parser.parse(entry.updated).date()
 
-        from_date = self.options.until.date
-        while from_date > self.options.since.date:
+    def feed(self, from_date):
+        """ Fetch all activity entries of the window up to the date """
+        start = from_date - self.parent.activity_days
+        entries = []
+        while True:
             feed_url = '{0}/activity.atom?user_id={1}&from={2}'.format(
                 self.parent.url, self.user.login,
                 from_date.strftime('%Y-%m-%d'))
             log.debug(f"Feed url: {feed_url}")
             feed = feedparser.parse(feed_url)
-            for entry in feed.entries:
-                updated = dateutil.parser.parse(entry.updated).date()
-                if updated >= self.options.since.date:
-                    results.append(entry)
+            entries.extend(feed.entries)
+            # Number of entries in a feed is limited, when the feed is
+            # full fetch the rest of the window starting from the oldest
+            if len(feed.entries) < self.parent.feeds_limit:
+                return entries
+            oldest = min(self.updated(entry) for entry in feed.entries)
+            if oldest <= start:
+                return entries
+            if oldest >= from_date:
+                log.warning(
+                    "Too many activities on {0}, some might be missing. "
+                    "Check the 'feeds_limit' option.".format(from_date))
+                return entries
+            from_date = oldest
+
+    def fetch(self):
+        log.info("Searching for activity by {0}".format(self.user))
+        # Feed windows are independent, prepare all of them up-front
+        windows = []
+        from_date = self.options.until.date
+        while from_date > self.options.since.date:
+            windows.append(from_date)
             from_date = from_date - self.parent.activity_days
 
+        # Download feeds in parallel, keep the original order
+        results = []
+        seen = set()
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for entries in executor.map(self.feed, windows):
+                for entry in entries:
+                    # Re-fetched windows overlap, skip duplicate entries
+                    key = entry.get("id", id(entry))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if self.updated(entry) >= self.options.since.date:
+                        results.append(entry)
+
         self.stats = [Activity(activity) for activity in results]
 
 
@@ -94,10 +141,17 @@ class RedmineStats(StatsGroup):
             raise ReportError(
                 "No Redmine url set in the [{0}] section".format(option))
         try:
-            self.activity_days = datetime.timedelta(config["activity_days"])
-        except KeyError:
-            # 30 is value of activity_days_default
-            self.activity_days = datetime.timedelta(30)
+            self.activity_days = datetime.timedelta(
+                int(config.get("activity_days", ACTIVITY_DAYS)))
+            self.feeds_limit = int(config.get("feeds_limit", FEEDS_LIMIT))
+        except ValueError as error:
+            raise ReportError(
+                "Invalid number in the [{0}] section: {1}".format(
+                    option, error))
+        if self.activity_days.days <= 0 or self.feeds_limit <= 0:
+            raise ReportError(
+                "The activity_days and feeds_limit must be positive "
+                "in the [{0}] section".format(option))
         # Create the list of stats
         self.stats = [
             RedmineActivity(
@@ -16,25 +16,25 @@ token in a file, use ``token_file`` to point to the file that has
 your token.
 """
 
-import re
+import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-import dateutil
 import requests
 
 from did.base import Config, ConfigError, ReportError, get_token
 from did.stats import Stats, StatsGroup
-from did.utils import listed, log, pretty
-
-NEXT_PAGE = re.compile('<([^>]+)>; rel="next"; results="true"')
-
+from did.utils import LOG_DATA, listed, log, pretty
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Issue & Activity
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+
 class Issue(object):
     """ Sentry Issue """
 
+    __slots__ = ("identifier", "title")
+
     def __init__(self, issue):
         """ Initialize issue """
         self.identifier = issue["shortId"]
@@ -48,13 +48,17 @@ class Issue(object):
 class Activity(object):
     """ Sentry Activity """
 
+    __slots__ = ("issue", "email", "kind", "created")
+
     def __init__(self, activity):
         """ Initialize issue """
         self.issue = Issue(activity['issue'])
-        self.user = activity['user']
+        # Keep just the email, some activities have no user
+        self.email = (activity['user'] or {}).get('email')
         self.kind = activity['type']
-        # Parse creation date
-        self.created = dateutil.parser.parse(activity["dateCreated"]).date()
+        # Creation date in fixed iso format, e.g. 2023-01-20T10:00:00Z
+        self.created = datetime.date.fromisoformat(
+            activity["dateCreated"][:10])
 
     def __str__(self):
         """ Unicode representation """
@@ -73,7 +77,11 @@ class Sentry(object):
         self.url = config['url'].rstrip('/')
         self.organization = config['organization']
         self.headers = {'Authorization': 'Bearer {0}'.format(config['token'])}
+        # Keep the connection alive for all pages
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
         self._activities = None
+        self._issues = None
         self.stats = stats
 
     def activities(self):
@@ -84,10 +92,37 @@ class Sentry(object):
 
     def issues(self, kind, email):
         """ Filter unique issues for given activity type and email """
-        return list(set([
-            str(activity.issue)
-            for activity in self.activities()
-            if kind == activity.kind and activity.user['email'] == email]))
+        # Index issues by activity type and email (only once)
+        if self._issues is None:
+            self._issues = {}
+            for activity in self.activities():
+                self._issues.setdefault(
+                    (activity.kind, activity.email), set()).add(
+                        str(activity.issue))
+        return sorted(self._issues.get((kind, email), []))
+
+    def _fetch_page(self, url):
+        """ Fetch one page of activities and the next page url """
+        try:
+            log.debug('Fetching activity data: {0}'.format(url))
+            response = self.session.get(url)
+            if not response.ok:
+                log.error(response.text)
+                raise ReportError('Failed to fetch Sentry activities.')
+            data = response.json()
+            log.debug("Fetched {0}.".format(listed(len(data), 'activity')))
+            if log.isEnabledFor(LOG_DATA):
+                log.data("Response headers:\n{0}".format(
+                    pretty(response.headers)))
+                log.data(pretty(data))
+        except requests.RequestException as error:
+            log.debug(error)
+            raise ReportError(
+                'Failed to fetch Sentry activities from {0}'.format(url))
+        # Check for possible next page (parsed from the Link header)
+        link = response.links.get("next", {})
+        url = link.get("url") if link.get("results") == "true" else None
+        return data, url
 
     def _fetch_activities(self):
         """ Get organization activity, handle pagination """
@@ -95,20 +130,16 @@ class Sentry(object):
         # Prepare url of the first page
         url = '{0}/organizations/{1}/activity/'.format(
             self.url, self.organization)
-        while url:
-            # Fetch one page of activities
-            try:
-                log.debug('Fetching activity data: {0}'.format(url))
-                response = requests.get(url, headers=self.headers)
-                if not response.ok:
-                    log.error(response.text)
-                    raise ReportError('Failed to fetch Sentry activities.')
-                data = response.json()
-                log.data("Response headers:\n{0}".format(
-                    pretty(response.headers)))
-                log.debug("Fetched {0}.".format(listed(len(data), 'activity')))
-                log.data(pretty(data))
-                for activity in [Activity(item) for item in data]:
+        # Next page is requested while the current one is processed
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            page = executor.submit(self._fetch_page, url)
+            while page:
+                data, url = page.result()
+                page = executor.submit(self._fetch_page, url) if url else None
+                # Create activities one by one, stop as soon as possible
+                for item in data:
+                    activity = Activity(item)
                     # We've reached the last page, older records not
                     # relevant
                     if activity.created < self.stats.options.since.date:
@@ -117,15 +148,9 @@ class Sentry(object):
                     if activity.created < self.stats.options.until.date:
                         log.details("Activity: {0}".format(activity))
                         activities.append(activity)
-            except requests.RequestException as error:
-                log.debug(error)
-                raise ReportError(
-                    'Failed to fetch Sentry activities from {0}'.format(url))
-            # Check for possible next page
-            try:
-                url = NEXT_PAGE.search(response.headers['Link']).groups()[0]
-            except AttributeError:
-                url = None
+        finally:
+            # Do not wait for the next page if it is not needed
+            executor.shutdown(wait=False)
         return activities
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
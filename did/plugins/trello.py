@@ -41,13 +41,12 @@ Optional arguments::
 # Possible API methods to add:
 # http://developers.trello.com/advanced-reference/member
 
-import json
-import urllib.parse
-import urllib.request
+import requests
+from requests.adapters import HTTPAdapter
 
-from did.base import Config, ReportError, get_token
-from did.stats import Stats, StatsGroup
-from did.utils import listed, log, pretty, split
+from did.base import Config, GeneralError, ReportError, get_token
+from did.stats import PREFETCH_WORKERS, Stats, StatsGroup
+from did.utils import LOG_DATA, listed, log, pretty, split
 
 DEFAULT_FILTERS = [
     "commentCard", "createCard", "updateCard",
@@ -55,6 +54,15 @@ DEFAULT_FILTERS = [
     "updateCheckItemStateOnCard"]
 
 
+def matches(action, filt):
+    """ Check whether action matches given filter """
+    kind, _, field = filt.partition(":")
+    if action["type"] != kind:
+        return False
+    # Updates of a specific field have the previous value stored
+    return not field or field in action["data"].get("old", {})
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Trello Stats
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -69,6 +77,26 @@ class TrelloStats(Stats):
         self.filt = filt
         self.trello = trello
 
+    # Description of searched actions for logging
+    activity = None
+
+    @staticmethod
+    def format_action(act):
+        """ Format action for the report """
+        raise NotImplementedError()
+
+    def fetch(self):
+        log.info(
+            "Searching for %s in %s by %s",
+            self.activity, self.parent.option, self.user)
+        actions = {
+            self.format_action(act)
+            for act in self.trello.get_actions(
+                filters=self.filt,
+                since=self.options.since.date,
+                before=self.options.until.date)}
+        self.stats = sorted(actions)
+
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Trello API
@@ -77,6 +105,9 @@ class TrelloStats(Stats):
 class TrelloAPI(object):
     """ Trello API """
 
+    # Responses shared by all sections using the same account
+    _responses = {}
+
     def __init__(self, stats, config):
         self.stats = stats
 
@@ -86,6 +117,29 @@ class TrelloAPI(object):
         self.board_links = split(config['board_links'])
         self.board_ids = self.board_links_to_ids()
 
+    def request(self, path, params):
+        """ Prepare url, parameters and cache key of given request """
+        url = "{0}/members/{1}/{2}".format(
+            self.stats.url, self.username, path)
+        params = dict(params, key=self.key, token=self.token)
+        return url, params, (url, tuple(sorted(params.items())))
+
+    def get(self, path, params):
+        """ Fetch given member data, return decoded json """
+        url, params, key = self.request(path, params)
+        # Sections differ only in boards which are filtered locally,
+        # so the same data do not have to be fetched again
+        if key in TrelloAPI._responses:
+            return TrelloAPI._responses[key]
+        try:
+            response = self.stats.session.get(url, params=params)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as error:
+            log.debug(error)
+            raise ReportError("Failed to fetch Trello {0}.".format(path))
+        TrelloAPI._responses[key] = response.json()
+        return TrelloAPI._responses[key]
+
     def get_actions(self, filters, since=None, before=None, limit=1000):
         """
         Example of data structure:
@@ -94,33 +148,48 @@ class TrelloAPI(object):
         if limit > 1000:
             raise NotImplementedError(
                 "Fetching more than 1000 items is not implemented")
-        resp = self.stats.session.open(
-            "{0}/members/{1}/actions?{2}".format(
-                self.stats.url, self.username, urllib.parse.urlencode({
-                    "key": self.key,
-                    "token": self.token,
-                    "filter": filters,
-                    "limit": limit,
-                    "since": str(since),
-                    "before": str(before)})))
-
-        actions = json.loads(resp.read())
-        log.data(pretty(actions))
+        actions = self.get("actions", self.actions_params(
+            filters, since, before, limit))
+        if log.isEnabledFor(LOG_DATA):
+            log.data(pretty(actions))
         # print[act for act in actions if "shortLink" not in
         # act['data']['board'].keys()]
         actions = [act for act in actions if act['data']
                    ['board']['id'] in self.board_ids]
         return actions
 
+    @staticmethod
+    def actions_params(filters, since, before, limit):
+        """ Parameters of the actions request """
+        return {
+            "filter": filters,
+            "limit": limit,
+            "since": str(since),
+            "before": str(before)}
+
+    def prefetch(self, filters, since=None, before=None, limit=1000):
+        """
+        Fetch actions of multiple filters using a single request
+
+        Actions are sorted into responses of individual filters which
+        are then used by get_actions(). Returns False if the response
+        was truncated by the limit and filters have to be fetched
+        separately.
+        """
+        actions = self.get("actions", self.actions_params(
+            ",".join(filters), since, before, limit))
+        if len(actions) >= limit:
+            return False
+        for filt in filters:
+            _, _, key = self.request("actions", self.actions_params(
+                filt, since, before, limit))
+            TrelloAPI._responses[key] = [
+                action for action in actions if matches(action, filt)]
+        return True
+
     def board_links_to_ids(self):
         """ Convert board links to ids """
-        resp = self.stats.session.open(
-            "{0}/members/{1}/boards?{2}".format(
-                self.stats.url, self.username, urllib.parse.urlencode({
-                    "key": self.key,
-                    "token": self.token,
-                    "fields": "shortLink"})))
-        boards = json.loads(resp.read())
+        boards = self.get("boards", {"fields": "shortLink"})
 
         return [board['id'] for board in boards if self.board_links == [""]
                 or board['shortLink'] in self.board_links]
@@ -133,17 +202,11 @@ class TrelloAPI(object):
 class TrelloCardsCreated(TrelloStats):
     """ Trello cards created """
 
-    def fetch(self):
-        log.info(
-            "Searching for cards created in %s by %s",
-            self.parent.option, self.user)
-        actions = [
-            act['data']['card']['name']
-            for act in self.trello.get_actions(
-                filters=self.filt,
-                since=self.options.since.date,
-                before=self.options.until.date)]
-        self.stats = sorted(list(set(actions)))
+    activity = "cards created"
+
+    @staticmethod
+    def format_action(act):
+        return act['data']['card']['name']
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -153,33 +216,21 @@ class TrelloCardsCreated(TrelloStats):
 class TrelloCardsUpdated(TrelloStats):
     """ Trello cards updated"""
 
-    def fetch(self):
-        log.info(
-            "Searching for cards updated in %s by %s",
-            self.parent.option, self.user)
-        actions = [
-            act['data']['card']['name']
-            for act in self.trello.get_actions(
-                filters=self.filt,
-                since=self.options.since.date,
-                before=self.options.until.date)]
-        self.stats = sorted(list(set(actions)))
+    activity = "cards updated"
+
+    @staticmethod
+    def format_action(act):
+        return act['data']['card']['name']
 
 
 class TrelloCardsCommented(TrelloStats):
     """ Trello cards commented"""
 
-    def fetch(self):
-        log.info(
-            "Searching for cards commented in %s by %s",
-            self.parent.option, self.user)
-        actions = [
-            act['data']['card']['name']
-            for act in self.trello.get_actions(
-                filters=self.filt,
-                since=self.options.since.date,
-                before=self.options.until.date)]
-        self.stats = sorted(list(set(actions)))
+    activity = "cards commented"
+
+    @staticmethod
+    def format_action(act):
+        return act['data']['card']['name']
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -189,22 +240,12 @@ class TrelloCardsCommented(TrelloStats):
 class TrelloCardsClosed(TrelloStats):
     """ Trello cards closed"""
 
-    def fetch(self):
-        log.info(
-            "Searching for cards closed in %s by %s",
-            self.parent.option, self.user)
-        status = {True: 'closed',
-                  False: 'opened'}
-        actions = [
-            "{0}: {1}".format(
-                act['data']['card']['name'],
-                status[act['data']['card']['closed']])
-            for act in self.trello.get_actions(
-                filters=self.filt,
-                since=self.options.since.date,
-                before=self.options.until.date)]
+    activity = "cards closed"
 
-        self.stats = sorted(list(set(actions)))
+    @staticmethod
+    def format_action(act):
+        status = 'closed' if act['data']['card']['closed'] else 'opened'
+        return "{0}: {1}".format(act['data']['card']['name'], status)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -214,21 +255,14 @@ class TrelloCardsClosed(TrelloStats):
 class TrelloCardsMoved(TrelloStats):
     """ Trello cards moved"""
 
-    def fetch(self):
-        log.info(
-            "Searching for cards moved in %s by %s",
-            self.parent.option, self.user)
-        actions = [
-            "[{0}] moved from [{1}] to [{2}]".format(
-                act['data']['card']['name'],
-                act['data']['listBefore']['name'],
-                act['data']['listAfter']['name'])
-            for act in self.trello.get_actions(
-                filters=self.filt,
-                since=self.options.since.date,
-                before=self.options.until.date)]
+    activity = "cards moved"
 
-        self.stats = sorted(list(set(actions)))
+    @staticmethod
+    def format_action(act):
+        return "[{0}] moved from [{1}] to [{2}]".format(
+            act['data']['card']['name'],
+            act['data']['listBefore']['name'],
+            act['data']['listAfter']['name'])
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -238,19 +272,13 @@ class TrelloCardsMoved(TrelloStats):
 class TrelloCheckItem(TrelloStats):
     """ Trello checklist items completed"""
 
-    def fetch(self):
-        log.info(
-            "Searching for CheckItem completed in %s by %s",
-            self.parent.option, self.user)
-        actions = [
-            "{0}: {1}".format(
-                act['data']['card']['name'],
-                act['data']['checkItem']['name'])
-            for act in self.trello.get_actions(
-                filters=self.filt,
-                since=self.options.since.date,
-                before=self.options.until.date)]
-        self.stats = sorted(list(set(actions)))
+    activity = "CheckItem completed"
+
+    @staticmethod
+    def format_action(act):
+        return "{0}: {1}".format(
+            act['data']['card']['name'],
+            act['data']['checkItem']['name'])
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -263,6 +291,9 @@ class TrelloStatsGroup(StatsGroup):
     # Default order
     order = 450
 
+    # Filters are fetched in parallel
+    prefetch_workers = PREFETCH_WORKERS
+
     def __init__(self, option, name=None, parent=None, user=None):
         name = "Trello updates for {0}".format(option)
         super(TrelloStatsGroup, self).__init__(
@@ -318,10 +349,26 @@ class TrelloStatsGroup(StatsGroup):
                     option=option + "-" + filt,
                     parent=self))
 
+    def check(self):
+        """ Try to get actions of all filters with a single request """
+        enabled = [stat for stat in self.stats if stat.enabled()]
+        if len(enabled) > 1:
+            # Filters are fetched separately (in parallel) otherwise
+            try:
+                enabled[0].trello.prefetch(
+                    [stat.filt for stat in enabled],
+                    since=self.options.since.date,
+                    before=self.options.until.date)
+            except GeneralError as error:
+                log.debug(error)
+        super(TrelloStatsGroup, self).check()
+
     @property
     def session(self):
         """ Initialize the session """
         if self._session is None:
-            self._session = urllib.request.build_opener(
-                urllib.request.HTTPHandler)
+            self._session = requests.Session()
+            # Keep a connection for each filter fetched in parallel
+            adapter = HTTPAdapter(pool_maxsize=len(DEFAULT_FILTERS))
+            self._session.mount("https://", adapter)
         return self._session
@@ -17,15 +17,50 @@ xmlrpc api endpoint::
     wiki test = http://moinmo.in/
 """
 
+import urllib.parse
 import xmlrpc.client
 
+import requests
+
 from did.base import Config, ConfigError, ReportError
-from did.stats import Stats, StatsGroup
+from did.stats import PREFETCH_WORKERS, Stats, StatsGroup
 from did.utils import item
 
 DEFAULT_API = '?action=xmlrpc2'
 
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Session Transport
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class SessionTransport(xmlrpc.client.Transport):
+    """ XML-RPC transport reusing connections of a given session """
+
+    def __init__(self, scheme, session):
+        super().__init__()
+        self.scheme = scheme
+        self.session = session
+
+    def request(self, host, handler, request_body, verbose=False):
+        """ Send the request using the session """
+        url = f"{self.scheme}://{host}{handler}"
+        # Redirects are reported as errors, as by the standard transport
+        try:
+            response = self.session.post(
+                url, data=request_body, allow_redirects=False,
+                headers={"Content-Type": "text/xml"})
+        except requests.exceptions.RequestException as error:
+            raise OSError(error)
+        if response.status_code != 200:
+            raise xmlrpc.client.ProtocolError(
+                url, response.status_code, response.reason,
+                response.headers)
+        parser, unmarshaller = self.getparser()
+        parser.feed(response.content)
+        parser.close()
+        return unmarshaller.close()
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Wiki Stats
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -33,28 +68,39 @@ DEFAULT_API = '?action=xmlrpc2'
 class WikiChanges(Stats):
     """ Wiki changes """
 
-    def __init__(self, option, name=None, parent=None, url=None, api=None):
+    def __init__(
+            self, option, name=None, parent=None, url=None, api=None,
+            session=None):
         self.url = url
         self.api = api or DEFAULT_API
         self.changes = 0
-        self.proxy = xmlrpc.client.ServerProxy("{0}{1}".format(url, self.api))
+        self._recent = None
+        scheme = urllib.parse.urlsplit(url).scheme or "http"
+        self.proxy = xmlrpc.client.ServerProxy(
+            "{0}{1}".format(url, self.api),
+            transport=SessionTransport(scheme, session))
         Stats.__init__(self, option, name, parent)
 
+    def recent_changes(self):
+        """ Fetch recent changes from the wiki (only once) """
+        if self._recent is None:
+            try:
+                self._recent = self.proxy.getRecentChanges(
+                    self.options.since.datetime)
+            except (xmlrpc.client.Error, OSError) as error:
+                raise ReportError(
+                    f"Unable to fetch wiki changes from '{self.url}' "
+                    f"because of '{error}'.")
+        return self._recent
+
     def fetch(self):
-        try:
-            changes = self.proxy.getRecentChanges(self.options.since.datetime)
-        except (xmlrpc.client.Error, OSError) as error:
-            raise ReportError(
-                f"Unable to fetch wiki changes from '{self.url}' "
-                f"because of '{error}'.")
-        for change in changes:
+        urls = set(self.stats)
+        for change in self.recent_changes():
             if (change["author"] == self.user.login
                     and change["lastModified"] < self.options.until.date):
                 self.changes += 1
-                url = self.url + change["name"]
-                if url not in self.stats:
-                    self.stats.append(url)
-        self.stats.sort()
+                urls.add(self.url + change["name"])
+        self.stats = sorted(urls)
 
     def header(self):
         """ Show summary header. """
@@ -82,13 +128,22 @@ class WikiStats(StatsGroup):
     # Default order
     order = 700
 
+    # Wikis are checked in parallel
+    prefetch_workers = PREFETCH_WORKERS
+
     def __init__(self, option, name=None, parent=None, user=None):
         StatsGroup.__init__(self, option, name, parent, user)
+        # Keep connections alive for all wikis of the group
+        session = requests.Session()
         try:
             api = Config().item(option, 'api')
         except ConfigError:
             api = None
         for wiki, url in Config().section(option, skip=['type', 'api']):
             self.stats.append(WikiChanges(
-                option=wiki, parent=self, url=url, api=api,
+                option=wiki, parent=self, url=url, api=api, session=session,
                 name="Updates on {0}".format(wiki)))
+
+    def prefetch(self, stat):
+        """ Fetch recent changes, they are stored for the check """
+        stat.recent_changes()
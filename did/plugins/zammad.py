@@ -12,20 +12,37 @@ Config example::
 Optionally use ``token_file`` to store the token in a file instead
 of plain in the config file.
 
+Use ``cache`` to store search results in the given file, e.g.
+``cache = ~/.did/zammad-cache.json``. Cached results are used for a
+few minutes, expired ones are revalidated using ETags so that
+unchanged results are not sent again.
+
 """
 
-import json
-import urllib.error
+import os
 import urllib.parse
-import urllib.request
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
 
 from did.base import Config, ReportError, get_token
 from did.stats import Stats, StatsGroup
-from did.utils import listed, log, pretty
+from did.utils import LOG_DATA, Cache, listed, log, pretty
 
 # Identifier padding
 PADDING = 3
 
+# Retry failed requests with a short backoff
+RETRY = Retry(
+    total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504],
+    raise_on_status=False)
+
+# Number of seconds cached search results are valid
+CACHE_EXPIRATION = 300
+
+# Number of seconds expired results are kept for revalidation
+CACHE_REVALIDATION = 7 * 24 * 3600
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Investigator
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -34,8 +51,8 @@ PADDING = 3
 class Zammad(object):
     """ Zammad Investigator """
 
-    def __init__(self, url, token):
-        """ Initialize url and headers """
+    def __init__(self, url, token, cache=None):
+        """ Initialize url, headers, session and cache """
         self.url = url.rstrip("/")
         if token is not None:
             self.headers = {'Authorization': 'Token token={0}'.format(token)}
@@ -43,27 +60,47 @@ class Zammad(object):
             self.headers = {}
 
         self.token = token
+        # Reuse connections to the server for all requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(max_retries=RETRY)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache = Cache(cache, "Zammad", revalidation=CACHE_REVALIDATION)
 
     def search(self, query):
         """ Perform Zammad query """
         url = self.url + "/" + query
         log.debug("Zammad query: {0}".format(url))
+        cached = self.cache.fresh(url)
+        if cached:
+            log.debug("Using cached search result")
+            return cached["data"]
+        # Revalidate expired results, unchanged data are not sent again
+        revalidate = self.cache.headers(url)
         try:
-            request = urllib.request.Request(url, headers=self.headers)
-            response = urllib.request.urlopen(request)
-            log.debug("Response headers:\n{0}".format(
-                str(response.info()).strip()))
-        except urllib.error.URLError as error:
+            response = self.session.get(
+                url, headers=dict(self.headers, **revalidate))
+            response.raise_for_status()
+            log.debug("Response headers:\n{0}".format(response.headers))
+        except requests.exceptions.RequestException as error:
             log.debug(error)
             raise ReportError(
                 "Zammad search on {0} failed.".format(self.url))
-        result = json.loads(response.read())["assets"]
-        try:
-            result = result["Ticket"]
-        except KeyError:
-            result = dict()
+        if revalidate and response.status_code == 304:
+            log.debug("Search result not modified")
+            result = self.cache.revalidated(url, CACHE_EXPIRATION)["data"]
+        else:
+            result = response.json()["assets"]
+            try:
+                result = result["Ticket"]
+            except KeyError:
+                result = dict()
+            self.cache.store(
+                url, result, etag=response.headers.get("ETag"),
+                expiration=CACHE_EXPIRATION)
         log.debug("Result: {0} fetched".format(listed(len(result), "item")))
-        log.data(pretty(result))
+        if log.isEnabledFor(LOG_DATA):
+            log.data(pretty(result))
         return result
 
 
@@ -74,8 +111,9 @@ class Zammad(object):
 class Ticket(object):
     """ Zammad Ticket """
 
+    __slots__ = ("title", "id")
+
     def __init__(self, data):
-        self.data = data
         self.title = data["title"]
         self.id = data["id"]
 
@@ -123,10 +161,19 @@ class ZammadStats(StatsGroup):
                 "No zammad url set in the [{0}] section".format(option))
         # Check authorization token
         self.token = get_token(config)
-        self.zammad = Zammad(self.url, self.token)
+        # Optional cache of search results
+        cache = config.get("cache")
+        self.zammad = Zammad(
+            self.url, self.token,
+            cache=os.path.expanduser(cache) if cache else None)
         # Create the list of stats
         self.stats = [
             TicketsUpdated(
                 option=option + "-tickets-updated", parent=self,
                 name="Tickets updated on {0}".format(option)),
             ]
+
+    def check(self):
+        """ Check all stats, store search results for later """
+        super().check()
+        self.zammad.cache.save()
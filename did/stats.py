@@ -4,11 +4,15 @@
 
 import re
 import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
 
 import did.base
 from did import utils
 from did.utils import log
 
+# Default number of children stats prefetched in parallel
+PREFETCH_WORKERS = 8
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Stats
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -19,6 +23,8 @@ class Stats(object):
     _name = None
     _error = None
     _enabled = None
+    _fetched = False
+    _fetch_error = None
     option = None
     dest = None
     parent = None
@@ -75,7 +81,12 @@ class Stats(object):
         if not self.enabled():
             return
         try:
-            self.fetch()
+            # Stats prefetched by the group are not fetched again,
+            # errors encountered during the prefetch are raised here
+            if self._fetch_error is not None:
+                raise self._fetch_error
+            if not self._fetched:
+                self.fetch()
         except (xmlrpc.client.Fault, did.base.ConfigError) as error:
             log.error(error)
             self._error = True
@@ -142,6 +153,9 @@ class StatsGroup(Stats, metaclass=StatsGroupPlugin):
     # Default order
     order = 500
 
+    # Number of parallel prefetch workers, zero disables prefetching
+    prefetch_workers = 0
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.arguments = []
@@ -163,8 +177,26 @@ class StatsGroup(Stats, metaclass=StatsGroupPlugin):
         group.add_argument(
             "--{0}".format(self.option), action="store_true", help="All above")
 
+    def prefetch(self, stat):
+        """ Prefetch a child stat, by default fetch it completely """
+        stat.fetch()
+        stat._fetched = True
+
     def check(self):
         """ Check all children stats. """
+        # Prefetch enabled children in parallel if supported
+        enabled = [stat for stat in self.stats if stat.enabled()]
+        if self.prefetch_workers and len(enabled) > 1:
+            def prefetch(stat):
+                # Errors are reported when the stat is checked below
+                try:
+                    self.prefetch(stat)
+                except did.base.GeneralError as error:
+                    stat._fetch_error = error
+
+            with ThreadPoolExecutor(max_workers=min(
+                    self.prefetch_workers, len(enabled))) as executor:
+                list(executor.map(prefetch, enabled))
         for stat in self.stats:
             stat.check()
 
@@ -3,12 +3,15 @@
 """ Logging, config, constants & utilities """
 
 import importlib
+import json
 import logging
 import os
 import pkgutil
 import re
 import sys
+import time
 import unicodedata
+from functools import lru_cache
 from pprint import pformat as pretty  # noqa: F401 (used by other modules)
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -39,6 +42,9 @@ LOG_ALL = 1
 # See: http://stackoverflow.com/questions/14010875
 EMAIL_REGEXP = re.compile(r'(?:"?([^"]*)"?\s)?(?:<?(.+@[^>]+)>?)')
 
+# Components already scanned, keyed by path and filters
+_loaded_components = {}
+
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Utils
@@ -84,6 +90,11 @@ def _load_components(
 
     path = path.rstrip("/").replace("/", ".")
 
+    # Modules stay imported, no need to scan the package again
+    key = (path, include, exclude)
+    if key in _loaded_components:
+        return _loaded_components[key]
+
     package = _import(path, continue_on_error)
     if not package:
         return 0
@@ -109,6 +120,7 @@ def _load_components(
                 _import(name, continue_on_error)
                 num_loaded += 1
 
+    _loaded_components[key] = num_loaded
     return num_loaded
 
 
@@ -187,6 +199,7 @@ def shorted(text, width=MAX_WIDTH):
     return "\n".join(lines)
 
 
+@lru_cache(maxsize=32)
 def strtobool(val):
     """
     Convert a string representation of truth to true (1) or false (0).
@@ -546,6 +559,86 @@ class Coloring(object):
         return self._mode == COLOR_ON
 
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Cache
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class Cache(object):
+    """
+    Json file cache of fetched data with ETag revalidation
+
+    Entries are valid until they expire. Expired entries with an ETag
+    are kept for ``revalidation`` seconds so that the server can
+    confirm that they have not changed. Without a path nothing is
+    stored and all lookups miss.
+    """
+
+    def __init__(self, path, name, revalidation):
+        """ Load cached entries from given file (if any) """
+        self.path = path
+        self.name = name
+        self.revalidation = revalidation
+        self.entries = {}
+        if path is None:
+            return
+        try:
+            with open(path) as cache:
+                self.entries = json.load(cache)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as error:
+            log.warning(f"Unable to read {name} cache '{path}', ignoring.")
+            log.debug(error)
+        log.debug(f"Loaded {listed(len(self.entries), 'cached response')}")
+
+    def fresh(self, key):
+        """ Entry for given key if it has not expired yet """
+        entry = self.entries.get(key)
+        if entry and entry.get("expires", 0) > time.time():
+            return entry
+        return None
+
+    def headers(self, key):
+        """ Request headers for revalidating an expired entry """
+        entry = self.entries.get(key)
+        if entry and entry.get("etag"):
+            return {"If-None-Match": entry["etag"]}
+        return {}
+
+    def revalidated(self, key, expiration=0):
+        """ Extend an entry confirmed unchanged by the server """
+        entry = self.entries[key]
+        entry["expires"] = time.time() + expiration
+        return entry
+
+    def store(self, key, data, etag=None, expiration=0, **extra):
+        """ Store fetched data valid for given number of seconds """
+        if self.path is None:
+            return
+        self.entries[key] = dict(
+            extra, data=data, etag=etag, expires=time.time() + expiration)
+
+    def save(self):
+        """ Store valid and revalidable entries to the cache file """
+        if self.path is None:
+            return
+        now = time.time()
+        entries = {
+            key: entry for key, entry in self.entries.items()
+            if entry.get("expires", 0) > now
+            or entry.get("etag")
+            and entry.get("expires", 0) > now - self.revalidation}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self.path, "w") as output:
+                json.dump(entries, output)
+        except OSError as error:
+            log.warning(f"Unable to write {self.name} cache '{self.path}'.")
+            log.debug(error)
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Default Logger
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
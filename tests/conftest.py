@@ -0,0 +1,29 @@
+# coding: utf-8
+""" Shared fixtures for all tests """
+
+import sys
+
+import pytest
+
+# Process-wide caches of fetched data (module, class, attribute)
+CACHES = [
+    ("did.utils", None, "_loaded_components"),
+    ("did.plugins.git", "GitRepo", "_instances"),
+    ("did.plugins.jira", "Issue", "_batches"),
+    ("did.plugins.jira", "JiraStats", "_sessions"),
+    ("did.plugins.trello", "TrelloAPI", "_responses"),
+    ]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """ Do not share cached data between tests """
+    yield
+    for name, owner, attribute in CACHES:
+        # Plugins which have not been imported have nothing cached
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        if owner is not None:
+            module = getattr(module, owner)
+        getattr(module, attribute).clear()
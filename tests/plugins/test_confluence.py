@@ -0,0 +1,32 @@
+# coding: utf-8
+""" Tests for the Confluence plugin """
+
+import pytest
+
+from did.plugins.confluence import ConfluenceComment
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Comment
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+@pytest.mark.parametrize("text,expected", [
+    # Well-formed html
+    ("plain text", "plain text"),
+    ("<p>Hello</p>", "Hello"),
+    ("<p></p>", ""),
+    ("<p>one</p><p>two</p>", "one two"),
+    ('<p>a <a href="x">link</a></p>', "a link"),
+    ("a<br/>b", "ab"),
+    # Malformed markup
+    ("<b>bold", "bold"),
+    ("a < b", "a < b"),
+    ("a<<b>c", "a<c"),
+    ("<>", "<>"),
+    ("x<>y", "x<>y"),
+    # Paragraphs are joined before any enclosing tag is removed
+    ("a<</p><p>>", "a< >"),
+    ])
+def test_strip_html(text, expected):
+    """ Html tags are removed, paragraphs joined """
+    assert ConfluenceComment.strip_html(text) == expected
@@ -3,12 +3,16 @@
 
 import os
 import time
-from tempfile import NamedTemporaryFile
+from unittest import mock
 
 import pytest
+import requests
+from requests.adapters import HTTPAdapter
 
 import did.base
 import did.cli
+import did.plugins.github
+import did.utils
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Constants
@@ -26,99 +30,135 @@ url = https://api.github.com/
 login = psss
 """
 
+# Just the github section, email is given on the command line
+CONFIG_MINIMAL = "[gh]\ntype = github\nurl = https://api.github.com/"
+
 # GitHub has quite strict limits for unauthenticated searches
 # https://developer.github.com/v3/search/#rate-limit
-# Let's have a short nap after each test
-
-
-def teardown_function(function):
-    time.sleep(7)
+# Let's have a short nap after each test if there are no rate limit
+# headers to tell how long we should wait
+DEFAULT_WAIT = 7
+
+# Optional directory for caching responses between test runs
+CACHE = os.environ.get("DID_TEST_CACHE")
+
+
+@pytest.fixture(scope="module")
+def adapter():
+    """ Connection pool shared by all tests """
+    adapter = HTTPAdapter(
+        pool_connections=did.plugins.github.MAX_WORKERS,
+        pool_maxsize=did.plugins.github.MAX_WORKERS,
+        max_retries=did.plugins.github.RETRY)
+    yield adapter
+    adapter.close()
+
+
+@pytest.fixture(autouse=True)
+def rate_limit(monkeypatch, adapter):
+    """ Wait after searches only as much as the rate limit requires """
+    searches = []
+    init = did.plugins.github.GitHub.__init__
+
+    def remember_search(response, *args, **kwargs):
+        # Failed searches do not really consume the search quota
+        if response.status_code == 200 and "/search/" in response.url:
+            searches.append(response)
+
+    def remember_responses(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        # Unchanged responses are not sent again on repeated runs
+        if CACHE and self.cache.path is None:
+            self.cache = did.utils.Cache(
+                os.path.join(CACHE, "github.json"), "GitHub",
+                revalidation=did.plugins.github.CACHE_EXPIRATION)
+        # Keep connections alive across tests
+        self.session.mount("https://", adapter)
+        self.session.hooks["response"].append(remember_search)
+
+    monkeypatch.setattr(
+        did.plugins.github.GitHub, "__init__", remember_responses)
+    yield
+    # No successful search, no need to wait
+    if not searches:
+        return
+    headers = searches[-1].headers
+    try:
+        remaining = int(headers["X-RateLimit-Remaining"])
+        reset = int(headers["X-RateLimit-Reset"])
+    except (KeyError, ValueError):
+        time.sleep(DEFAULT_WAIT)
+        return
+    # Spread remaining requests evenly until the limit is reset
+    wait = max(0, reset - time.time()) / max(remaining, 1)
+    if wait:
+        time.sleep(wait)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Tests
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def test_github_issues_created():
-    """ Created issues """
-    did.base.Config(CONFIG)
-    option = "--gh-issues-created "
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[0].stats
-    assert any([
-        "psss/did#017 - What did you do" in str(stat) for stat in stats])
-
-
-def test_github_issues_closed():
-    """ Closed issues """
-    did.base.Config(CONFIG)
-    option = "--gh-issues-closed "
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[2].stats
-    assert any([
-        "psss/did#017 - What did you do" in str(stat) for stat in stats])
+@pytest.mark.parametrize(
+    "login,option,interval,index,expected",
+    [
+        ("psss", "--gh-issues-created", INTERVAL, 0,
+         "psss/did#017 - What did you do"),
+        ("psss", "--gh-issues-closed", INTERVAL, 2,
+         "psss/did#017 - What did you do"),
+        ("psss", "--gh-pull-requests-closed",
+         "--since 2015-09-22 --until 2015-09-22", 5,
+         "psss/did#037 - Skip CI users"),
+        ("evgeni", "--gh-pull-requests-reviewed",
+         "--since 2017-02-22 --until 2017-02-23", 6,
+         "Katello/katello-client-bootstrap#164"),
+        ("psss", "--gh-pull-requests-commented",
+         "--since 2023-01-10 --until 2023-01-23", 4,
+         "psss/did#285 - Fix error when building SRPM in copr"),
+        ("psss", "--gh-issues-commented",
+         "--since 2023-01-10 --until 2023-01-23", 1,
+         "teemtee/tmt#1788 - Allow modification of imported plans"),
+        ],
+    ids=[
+        "issues-created",
+        "issues-closed",
+        "pull-requests-closed",
+        "pull-requests-reviewed",
+        "pull-requests-commented",
+        "issues-commented",
+        ],
+    )
+def test_github_stats(login, option, interval, index, expected):
+    """ Issues and pull requests of given user """
+    did.base.Config(CONFIG.replace("psss", login))
+    stats = did.cli.main(
+        f"{option} {interval}")[0][0].stats[0].stats[index].stats
+    assert expected in "\n".join(map(str, stats))
 
 
 def test_github_pull_requests_created():
     """ Created pull requests """
-    did.base.Config("[gh]\ntype = github\nurl = https://api.github.com/")
+    did.base.Config(CONFIG_MINIMAL)
     option = "--gh-pull-requests-created "
     INTERVAL = "--since 2016-10-26 --until 2016-10-26"
     EMAIL = " --email mfrodl@redhat.com"
     stats = did.cli.main(
         option + INTERVAL + EMAIL)[0][0].stats[0].stats[3].stats
-    assert any([
-        "psss/did#112 - Fixed test for Trac plugin" in str(stat)
-        for stat in stats])
-
-
-def test_github_pull_requests_closed():
-    """ Closed pull requests """
-    did.base.Config(CONFIG)
-    option = "--gh-pull-requests-closed "
-    INTERVAL = "--since 2015-09-22 --until 2015-09-22"
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[5].stats
-    assert any([
-        "psss/did#037 - Skip CI users" in str(stat) for stat in stats])
-
-
-def test_github_pull_requests_reviewed():
-    """ Reviewed pull requests """
-    did.base.Config(CONFIG.replace('psss', 'evgeni'))
-    option = "--gh-pull-requests-reviewed "
-    INTERVAL = "--since 2017-02-22 --until 2017-02-23"
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[6].stats
-    assert any(["Katello/katello-client-bootstrap#164" in str(stat)
-                for stat in stats])
-
-
-def test_github_pull_requests_commented():
-    """ Commented pull requests """
-    did.base.Config(CONFIG)
-    option = "--gh-pull-requests-commented "
-    INTERVAL = "--since 2023-01-10 --until 2023-01-23"
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[4].stats
-    for stat in stats:
-        print(stat)
-    assert any([
-        "psss/did#285 - Fix error when building SRPM in copr"
-        in str(stat) for stat in stats])
-
-
-def test_github_issues_commented():
-    """ Commented issues """
-    did.base.Config(CONFIG)
-    option = "--gh-issues-commented "
-    INTERVAL = "--since 2023-01-10 --until 2023-01-23"
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[1].stats
-    assert any([
-        "teemtee/tmt#1788 - Allow modification of imported plans"
-        in str(stat) for stat in stats])
+    assert "psss/did#112 - Fixed test for Trac plugin" in "\n".join(
+        map(str, stats))
 
 
 def test_github_invalid_token():
     """ Invalid token """
     did.base.Config(CONFIG + "\ntoken = bad-token")
-    with pytest.raises(did.base.ReportError):
-        did.cli.main(INTERVAL)
+    # No need to bother the server, just pretend bad credentials
+    response = requests.Response()
+    response.status_code = 401
+    response._content = b'{"message": "Bad credentials"}'
+    with mock.patch(
+            "requests.adapters.HTTPAdapter.send", return_value=response):
+        with pytest.raises(did.base.ReportError):
+            did.cli.main(INTERVAL)
 
 
 def test_github_missing_url():
@@ -132,26 +172,46 @@ def test_github_unicode():
     """ Created issues with Unicode characters """
     INTERVAL = "--since 2016-02-23 --until 2016-02-23"
     EMAIL = " --email hasys@example.org"
-    did.base.Config("[gh]\ntype = github\nurl = https://api.github.com/")
+    did.base.Config(CONFIG_MINIMAL)
     option = "--gh-pull-requests-created "
     stats = did.cli.main(
         option + INTERVAL + EMAIL)[0][0].stats[0].stats[3].stats
-    assert any([
-        "Boundary events lose it’s documentation" in str(stat)
-        for stat in stats])
+    assert "Boundary events lose it’s documentation" in "\n".join(
+        map(str, stats))
 
 
 @pytest.mark.skipif("GITHUB_TOKEN" not in os.environ,
                     reason="No GITHUB_TOKEN environment variable found")
-def test_github_issues_created_with_token_file():
+def test_github_issues_created_with_token_file(tmp_path):
     """ Created issues (config with token_file)"""
-    token = os.getenv(key="GITHUB_TOKEN")
-    with NamedTemporaryFile(mode="w+", encoding="utf-8") as file_handle:
-        file_handle.writelines(token)
-        file_handle.flush()
-        config = CONFIG + f"\ntoken_file = {file_handle.name}"
-        did.base.Config(config)
-        option = "--gh-issues-created "
-        stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[0].stats
-        assert any([
-            "psss/did#017 - What did you do" in str(stat) for stat in stats])
+    token_file = tmp_path / "token"
+    token_file.write_text(os.environ["GITHUB_TOKEN"], encoding="utf-8")
+    did.base.Config(CONFIG + f"\ntoken_file = {token_file}")
+    option = "--gh-issues-created "
+    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[0].stats
+    assert "psss/did#017 - What did you do" in "\n".join(map(str, stats))
+
+
+@pytest.mark.skipif("GITHUB_TOKEN" not in os.environ,
+                    reason="No GITHUB_TOKEN environment variable found")
+def test_github_graphql_search(monkeypatch):
+    """ Multiple searches fetched in a single GraphQL request """
+    # Cached responses are revalidated instead of using GraphQL
+    monkeypatch.setitem(globals(), "CACHE", None)
+    # Check the searches are done before falling back to REST api
+    prefetched = []
+    prefetch = did.plugins.github.GitHub.prefetch
+
+    def check_prefetch(self, queries):
+        prefetch(self, queries)
+        prefetched.append(len(self._search_cache))
+
+    monkeypatch.setattr(
+        did.plugins.github.GitHub, "prefetch", check_prefetch)
+    did.base.Config(CONFIG + f"\ntoken = {os.environ['GITHUB_TOKEN']}")
+    option = "--gh-issues-created --gh-issues-closed "
+    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats
+    assert prefetched == [2]
+    for index in (0, 2):
+        assert "psss/did#017 - What did you do" in "\n".join(
+            map(str, stats[index].stats))
@@ -2,9 +2,11 @@
 """ Tests for the GitLab plugin """
 
 import pytest
+import requests
 
 import did.base
 import did.cli
+from did.plugins.gitlab import GitLab
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Constants
@@ -108,3 +110,23 @@ def test_github_invalid_token():
     did.base.Config(CONFIG_NOTOKEN)
     with pytest.raises(did.base.ReportError):
         did.cli.main(INTERVAL)
+
+
+def test_gitlab_failed_page(monkeypatch):
+    """ Failed pages fetched in parallel are reported """
+    def get(url, verify=True):
+        response = requests.Response()
+        response.url = url
+        response.headers["x-total-pages"] = "3"
+        if "page=2" in url:
+            response.status_code = 500
+            response._content = b'{"message": "500 Internal Server Error"}'
+        else:
+            response.status_code = 200
+            response._content = b'[{"id": 1}]'
+        return response
+
+    gitlab = GitLab("https://gitlab.example.com", "token")
+    monkeypatch.setattr(gitlab.session, "get", get)
+    with pytest.raises(requests.exceptions.HTTPError):
+        gitlab._get_gitlab_api_list("users/1/events", get_all_results=True)
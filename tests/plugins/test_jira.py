@@ -3,11 +3,15 @@
 
 import os
 import sys
+from types import SimpleNamespace as Options
+
+import pytest
+import requests
 
 import did.base
 import did.cli
 from did.base import ReportError
-from did.plugins.jira import JiraStats
+from did.plugins.jira import Issue, JiraStats
 
 sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", ".."))
 
@@ -43,44 +47,61 @@ def test_config_basic_auth():
     JiraStats("jira")
 
 
-def test_config_missing_username():
-    """  Test basic auth with missing username """
-    assert_conf_error(CONFIG + "\n"
-                      + "auth_type = basic")
+@pytest.mark.parametrize(
+    "extra",
+    [
+        "auth_type = basic\n",
+        "auth_type = basic\nauth_username = tom\n",
+        "auth_type = gss\nauth_username = tom\n",
+        "auth_type = gss\nauth_password = tom\n",
+        "auth_type = gss\nauth_password_file = ~/.did/config\n",
+        ],
+    ids=[
+        "basic-missing-username",
+        "basic-missing-password",
+        "gss-and-username",
+        "gss-and-password",
+        "gss-and-password-file",
+        ],
+    )
+def test_config_auth_error(extra):
+    """  Test invalid combinations of authentication options """
+    assert_conf_error(CONFIG + "\n" + extra)
 
 
-def test_config_missing_password():
-    """  Test basic auth with missing username """
+def test_config_invaliad_ssl_verify():
+    """  Test ssl_verify with wrong bool value """
     assert_conf_error(CONFIG + "\n"
-                      + "auth_type = basic\n"
-                      + "auth_username = tom\n")
+                      + "ssl_verify = ss\n")
 
 
-def test_config_gss_and_username():
-    """  Test gss auth with username set """
+@pytest.mark.parametrize("value", ["many", "0", "-1"])
+def test_config_invalid_page_size(value):
+    """  Test page_size with non-numeric or non-positive value """
     assert_conf_error(CONFIG + "\n"
-                      + "auth_type = gss\n"
-                      + "auth_username = tom\n")
+                      + "page_size = {0}\n".format(value))
 
 
-def test_config_gss_and_password():
-    """  Test gss auth with password set """
+@pytest.mark.parametrize("value", ["many", "0", "-1"])
+def test_config_invalid_workers(value):
+    """  Test workers with non-numeric or non-positive value """
     assert_conf_error(CONFIG + "\n"
-                      + "auth_type = gss\n"
-                      + "auth_password = tom\n")
-
+                      + "workers = {0}\n".format(value))
 
-def test_config_gss_and_password_file():
-    """  Test gss auth with password set """
-    assert_conf_error(CONFIG + "\n"
-                      + "auth_type = gss\n"
-                      + "auth_password_file = ~/.did/config\n")
 
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Issue tests
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def test_config_invaliad_ssl_verify():
-    """  Test ssl_verify with wrong bool value """
-    assert_conf_error(CONFIG + "\n"
-                      + "ssl_verify = ss\n")
+def test_issue_hash():
+    """  Test that issues with the same key are deduplicated """
+    did.base.Config(CONFIG)
+    stats = JiraStats("jira")
+    issues = [
+        Issue({"key": key, "fields": {"summary": "Summary"}}, parent=stats)
+        for key in ["JBEAP-1", "JBEAP-2", "JBEAP-1"]]
+    assert issues[0] == issues[2]
+    assert len(set(issues)) == 2
 
 
 def assert_conf_error(config, expected_error=ReportError):
@@ -92,3 +113,27 @@ def assert_conf_error(config, expected_error=ReportError):
     except ReportError as e:
         error = e
     assert isinstance(error, expected_error)
+
+
+def test_batches_per_account():
+    """  Test that search results are not shared between accounts """
+    requested = []
+
+    class Session(object):
+        def post(self, url, json, headers=None):
+            requested.append(url)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"total": 0, "maxResults": 50, "issues": []}'
+            return response
+
+    for user in ["tom", "jerry", "tom"]:
+        did.base.Config(CONFIG + "auth_type = basic\n"
+                        + "auth_username = {0}\n".format(user)
+                        + "auth_password = secret\n")
+        stats = JiraStats("jira")
+        stats._session = Session()
+        stats.options = Options(until=did.base.Date("2020-01-01"))
+        Issue.fetch_batch("project = JBEAP", stats.stats[0], 0)
+    # The same account reuses already fetched results
+    assert len(requested) == 2
@@ -2,10 +2,17 @@
 """
 Tests for the Pagure plugin
 
-Test project: https://pagure.io/did
+Api responses are mocked using the data of the test project
+https://pagure.io/did
 """
 
+import calendar
+import datetime
+import json
+import urllib.parse
+
 import pytest
+import requests
 
 import did.base
 import did.cli
@@ -29,45 +36,105 @@ login = psss
 """
 
 
-# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-#  Tests
-# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-
-def test_pagure_issues_created():
-    """ Created issues """
+def timestamp(date):
+    """ Pagure timestamp of given date (at noon to avoid time zones) """
+    return str(calendar.timegm(
+        datetime.datetime.fromisoformat(date).replace(hour=12).timetuple()))
+
+
+def issue(identifier, title, created, closed=None):
+    """ Issue or pull request data as returned by the api """
+    return {
+        "id": identifier,
+        "title": title,
+        "project": {"fullname": "did"},
+        "full_url": f"https://pagure.io/did/issue/{identifier}",
+        "date_created": timestamp(created),
+        "closed_at": timestamp(closed) if closed else None,
+        }
+
+
+# Issues and pull requests of the test project
+ISSUES = [
+    issue(1, "Open Issue", "2018-11-26"),
+    issue(2, "Closed Issue", "2018-11-26", closed="2018-11-26"),
+    ]
+PULL_REQUESTS = [
+    issue(3, "Open Pull Request", "2018-11-26"),
+    ]
+
+
+def created(items, period):
+    """ Items created in the given period (until is exclusive) """
+    since, until = period.split("..")
+    return [
+        item for item in items
+        if timestamp(since) <= item["date_created"] < timestamp(until)]
+
+
+def get(url, headers=None):
+    """ Answer pagure api queries using the test data """
+    parts = urllib.parse.urlsplit(url)
+    query = dict(urllib.parse.parse_qsl(parts.query))
+    if parts.path.endswith("/requests/filed"):
+        data = {
+            "requests": created(PULL_REQUESTS, query["created"]),
+            "pagination": {"next": None}}
+    elif "created" in query:
+        data = {
+            "issues_created": created(ISSUES, query["created"]),
+            "pagination_issues_created": {"next": None}}
+    else:
+        data = {
+            "issues_assigned": ISSUES,
+            "pagination_issues_assigned": {"next": None}}
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = json.dumps(data).encode()
+    return response
+
+
+@pytest.fixture(autouse=True)
+def pagure(monkeypatch):
+    """ No need to bother the server, use the test data """
+    monkeypatch.setattr(requests, "get", get)
+
+
+@pytest.fixture(scope="module")
+def pagure_stats():
+    """ Stats of all periods, each fetched with a single run """
     did.base.Config(CONFIG)
-    option = "--pagure-issues-created "
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[0].stats
-    assert any(["did#1 - Open Issue" in str(stat) for stat in stats])
-    stats = did.cli.main(option + BEFORE)[0][0].stats[0].stats[0].stats
-    assert not stats
-    stats = did.cli.main(option + AFTER)[0][0].stats[0].stats[0].stats
-    assert not stats
+    options = " ".join([
+        "--pagure-issues-created",
+        "--pagure-issues-closed",
+        "--pagure-pull-requests-created"])
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(requests, "get", get)
+        return {
+            period: did.cli.main(f"{options} {period}")[0][0].stats[0].stats
+            for period in (INTERVAL, BEFORE, AFTER)}
 
 
-def test_pagure_issues_closed():
-    """ Closed issues """
-    did.base.Config(CONFIG)
-    option = "--pagure-issues-closed "
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[1].stats
-    assert any(["did#2 - Closed Issue" in str(stat) for stat in stats])
-    stats = did.cli.main(option + BEFORE)[0][0].stats[0].stats[1].stats
-    assert not stats
-    stats = did.cli.main(option + AFTER)[0][0].stats[0].stats[1].stats
-    assert not stats
-
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#  Tests
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def test_pagure_pull_requests_created():
-    """ Created pull requests """
-    did.base.Config(CONFIG)
-    option = "--pagure-pull-requests-created "
-    stats = did.cli.main(option + INTERVAL)[0][0].stats[0].stats[2].stats
-    assert any(
-        ["did#3 - Open Pull Request" in str(stat) for stat in stats])
-    stats = did.cli.main(option + BEFORE)[0][0].stats[0].stats[2].stats
-    assert not stats
-    stats = did.cli.main(option + AFTER)[0][0].stats[0].stats[2].stats
-    assert not stats
+@pytest.mark.parametrize(
+    "index,expected",
+    [
+        (0, "did#1 - Open Issue"),
+        (1, "did#2 - Closed Issue"),
+        (2, "did#3 - Open Pull Request"),
+        ],
+    ids=["issues-created", "issues-closed", "pull-requests-created"],
+    )
+def test_pagure_stats(pagure_stats, index, expected):
+    """ Issues and pull requests in and around the interval """
+    stats = pagure_stats[INTERVAL][index].stats
+    assert any(expected in str(stat) for stat in stats)
+    for period in (BEFORE, AFTER):
+        assert not pagure_stats[period][index].stats
 
 
 def test_pagure_missing_url():
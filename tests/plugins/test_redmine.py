@@ -1,8 +1,16 @@
 # coding: utf-8
 """ Tests for the Redmine plugin """
 
-# import did.base
-# import did.cli
+import datetime
+import urllib.parse
+
+import feedparser
+import pytest
+
+import did.base
+import did.cli
+from did.base import ReportError
+from did.plugins.redmine import RedmineStats
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Constants
@@ -20,10 +28,56 @@ url = https://projects.theforeman.org
 login = 4731
 """
 
+# Activity entries spread over the January interval, newest first
+ENTRIES = [
+    feedparser.FeedParserDict(
+        id=f"entry-{day}", title=f"Activity {day}",
+        updated=f"2020-01-{day:02}T10:00:00Z")
+    for day in (25, 22, 19, 16, 13, 10, 7, 5)]
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Tests
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+@pytest.mark.parametrize("extra", [
+    "activity_days = many",
+    "activity_days = 0",
+    "feeds_limit = 0",
+    "feeds_limit = -1",
+    ])
+def test_config_invalid_numbers(extra):
+    """ Activity days and feeds limit have to be positive numbers """
+    did.base.Config(CONFIG + extra + "\n")
+    with pytest.raises(ReportError):
+        RedmineStats("redmine")
+
+
+def test_redmine_full_feed(monkeypatch):
+    """ Full feeds continue from the oldest entry """
+    urls = []
+
+    def parse(url):
+        """ Serve at most three entries up to the 'from' date """
+        urls.append(url)
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        until = datetime.date.fromisoformat(query["from"][0])
+        since = until - datetime.timedelta(30)
+        entries = [
+            entry for entry in ENTRIES
+            if since < datetime.date.fromisoformat(entry.updated[:10])
+            <= until]
+        return feedparser.FeedParserDict(entries=entries[:3])
+
+    monkeypatch.setattr("feedparser.parse", parse)
+    did.base.Config(CONFIG + "feeds_limit = 3\n")
+    stats = did.cli.main(
+        "--redmine-activity " + INTERVAL)[0][0].stats[0].stats[0].stats
+    assert [str(stat) for stat in stats] == [
+        entry.title for entry in ENTRIES]
+    # Two windows, the first one continued from the oldest entry
+    assert len(urls) == 5
+
 # def test_redmine_activity():
 #    """ Redmine activity """
 #    did.base.Config(CONFIG)
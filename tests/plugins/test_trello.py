@@ -3,10 +3,14 @@
 
 """ Tests for the Trello plugin """
 
+import datetime
+import types
+
 import pytest
 
 import did.base
 import did.cli
+from did.plugins.trello import TrelloAPI, matches
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Constants
@@ -22,11 +26,106 @@ type = trello
 user = didtester
 """
 
+# Sample actions of a single board
+BOARD = {"id": "board"}
+UPDATED = {
+    "id": "1", "type": "updateCard",
+    "data": {"board": BOARD, "old": {"name": "Old name"}}}
+MOVED = {
+    "id": "2", "type": "updateCard",
+    "data": {"board": BOARD, "old": {"idList": "list"}}}
+CLOSED = {
+    "id": "3", "type": "updateCard",
+    "data": {"board": BOARD, "old": {"closed": False}}}
+COMMENTED = {
+    "id": "4", "type": "commentCard", "data": {"board": BOARD}}
+ACTIONS = [UPDATED, MOVED, CLOSED, COMMENTED]
+
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Tests
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+@pytest.mark.parametrize("action,filt,expected", [
+    (UPDATED, "updateCard", True),
+    (UPDATED, "updateCard:idList", False),
+    (UPDATED, "updateCard:closed", False),
+    (MOVED, "updateCard", True),
+    (MOVED, "updateCard:idList", True),
+    (MOVED, "updateCard:closed", False),
+    (CLOSED, "updateCard", True),
+    (CLOSED, "updateCard:idList", False),
+    (CLOSED, "updateCard:closed", True),
+    (COMMENTED, "updateCard", False),
+    (COMMENTED, "commentCard", True),
+    ])
+def test_trello_matches(action, filt, expected):
+    """ Actions are matched by type and updated field """
+    assert matches(action, filt) is expected
+
+
+class Session(object):
+    """ Remember requested filters, respond with sample actions """
+
+    def __init__(self):
+        self.filters = []
+
+    def get(self, url, params):
+        self.filters.append(params["filter"])
+        return Response()
+
+
+class Response(object):
+    """ Successful response with all sample actions """
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return list(ACTIONS)
+
+
+@pytest.fixture
+def trello(monkeypatch):
+    """ Trello api using the sample session """
+    monkeypatch.setattr(TrelloAPI, "_responses", {})
+    api = TrelloAPI.__new__(TrelloAPI)
+    api.stats = types.SimpleNamespace(
+        url="https://trello.com/1", session=Session())
+    api.key = api.token = "secret"
+    api.username = "me"
+    api.board_ids = [BOARD["id"]]
+    return api
+
+
+FILTERS = ["commentCard", "updateCard", "updateCard:idList",
+           "updateCard:closed"]
+SINCE = datetime.date(2018, 12, 19)
+BEFORE = datetime.date(2018, 12, 20)
+
+
+def test_trello_prefetch(trello):
+    """ Actions of all filters are fetched by a single request """
+    assert trello.prefetch(FILTERS, since=SINCE, before=BEFORE)
+    actions = {
+        filt: trello.get_actions(filt, since=SINCE, before=BEFORE)
+        for filt in FILTERS}
+    assert actions == {
+        "commentCard": [COMMENTED],
+        "updateCard": [UPDATED, MOVED, CLOSED],
+        "updateCard:idList": [MOVED],
+        "updateCard:closed": [CLOSED]}
+    assert trello.stats.session.filters == [",".join(FILTERS)]
+
+
+def test_trello_prefetch_limit(trello):
+    """ Filters are fetched separately if the limit is hit """
+    assert not trello.prefetch(FILTERS, since=SINCE, before=BEFORE, limit=4)
+    trello.get_actions("updateCard:idList", since=SINCE, before=BEFORE)
+    assert trello.stats.session.filters == [
+        ",".join(FILTERS), "updateCard:idList"]
+
+
 def test_trello_cards_commented():
     """ Commented cards """
     did.base.Config(CONFIG)
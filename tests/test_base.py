@@ -1,9 +1,6 @@
 # coding: utf-8
 
 import datetime
-import unittest
-from contextlib import contextmanager
-from tempfile import NamedTemporaryFile
 from uuid import uuid4
 
 import pytest
@@ -42,6 +39,23 @@ def test_Config_width():
     assert config.width == 123
 
 
+def test_Config_section():
+    config = Config("[test]\ntype = git\nrepo = ~/did\n")
+    assert config.section("test") == [("repo", "~/did")]
+    assert config.section("test", skip=[]) == [
+        ("type", "git"), ("repo", "~/did")]
+    # Looked up items are reset with a new config
+    config = Config("[test]\ntype = git\nrepo = ~/fmf\n")
+    assert config.section("test") == [("repo", "~/fmf")]
+
+
+def test_Config_parser_copy():
+    text = "[general]\nemail = email@example.com\n"
+    Config(text).parser.set("general", "email", "changed@example.com")
+    # The same config string gives a fresh parser
+    assert Config(text).email == "email@example.com"
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #  Date
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -51,100 +65,47 @@ def test_Date():
     assert Date
 
 
-def test_Date_period():
+# Period arguments with expected since, until and period description
+# (today is Saturday 2015-10-03)
+PERIODS = (
+    ("yesterday", "2015-10-02", "2015-10-03", "yesterday"),
+    ("", "2015-09-28", "2015-10-05", "the week 40"),
+    ("week", "2015-09-28", "2015-10-05", "the week 40"),
+    ("this week", "2015-09-28", "2015-10-05", "the week 40"),
+    ("last", "2015-09-21", "2015-09-28", "the week 39"),
+    ("last week", "2015-09-21", "2015-09-28", "the week 39"),
+    ("last monday", "2015-09-28", "2015-09-29", "the last monday"),
+    ("last tuesday", "2015-09-29", "2015-09-30", "the last tuesday"),
+    ("last wednesday", "2015-09-30", "2015-10-01", "the last wednesday"),
+    ("last thursday", "2015-10-01", "2015-10-02", "the last thursday"),
+    ("last friday", "2015-10-02", "2015-10-03", "the last friday"),
+    ("month", "2015-10-01", "2015-11-01", "October"),
+    ("this month", "2015-10-01", "2015-11-01", "October"),
+    ("last month", "2015-09-01", "2015-10-01", "September"),
+    ("quarter", "2015-10-01", "2016-01-01", "this quarter"),
+    ("this quarter", "2015-10-01", "2016-01-01", "this quarter"),
+    ("last quarter", "2015-07-01", "2015-10-01", "the last quarter"),
+    ("year", "2015-01-01", "2016-01-01", "this year"),
+    ("this year", "2015-01-01", "2016-01-01", "this year"),
+    ("last year", "2014-01-01", "2015-01-01", "the last year"),
+    )
+
+
+@pytest.mark.parametrize("argument,since,until,period", PERIODS)
+def test_Date_period(monkeypatch, argument, since, until, period):
+    from did.base import Date
+    monkeypatch.setattr(did.base, "TODAY", datetime.date(2015, 10, 3))
+    assert tuple(map(str, Date.period(argument))) == (since, until, period)
+
+
+def test_Date_arithmetic():
     from did.base import Date
-    today = did.base.TODAY
-    did.base.TODAY = datetime.date(2015, 10, 3)
-    # yesterday
-    for argument in ["yesterday"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-10-02"
-        assert str(until) == "2015-10-03"
-        assert period == "yesterday"
-    # This week
-    for argument in ["", "week", "this week"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-09-28"
-        assert str(until) == "2015-10-05"
-        assert period == "the week 40"
-    # Last week
-    for argument in ["last", "last week"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-09-21"
-        assert str(until) == "2015-09-28"
-        assert period == "the week 39"
-    # Last Monday
-    for argument in ["last monday"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-09-28"
-        assert str(until) == "2015-09-29"
-        assert period == "the last monday"
-    # Last Tuesday
-    for argument in ["last tuesday"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-09-29"
-        assert str(until) == "2015-09-30"
-        assert period == "the last tuesday"
-    # Last Wednesday
-    for argument in ["last wednesday"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-09-30"
-        assert str(until) == "2015-10-01"
-        assert period == "the last wednesday"
-    # Last Thursday
-    for argument in ["last thursday"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-10-01"
-        assert str(until) == "2015-10-02"
-        assert period == "the last thursday"
-    # Last Friday
-    for argument in ["last friday"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-10-02"
-        assert str(until) == "2015-10-03"
-        assert period == "the last friday"
-    # This month
-    for argument in ["month", "this month"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-10-01"
-        assert str(until) == "2015-11-01"
-        assert period == "October"
-    # Last month
-    for argument in ["last month"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-09-01"
-        assert str(until) == "2015-10-01"
-        assert period == "September"
-    # This quarter
-    for argument in ["quarter", "this quarter"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-10-01"
-        assert str(until) == "2016-01-01"
-        assert period == "this quarter"
-    # Last quarter
-    for argument in ["last quarter"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-07-01"
-        assert str(until) == "2015-10-01"
-        assert period == "the last quarter"
-    # This year
-    for argument in ["year", "this year"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2015-01-01"
-        assert str(until) == "2016-01-01"
-        assert period == "this year"
-    # Last year
-    for argument in ["last year"]:
-        since, until, period = Date.period(argument)
-        assert str(since) == "2014-01-01"
-        assert str(until) == "2015-01-01"
-        assert period == "the last year"
+
     # Adding and subtracting days
     assert str(Date('2018-11-29') + 1) == '2018-11-30'
     assert str(Date('2018-11-29') + 2) == '2018-12-01'
     assert str(Date('2018-12-02') - 1) == '2018-12-01'
     assert str(Date('2018-12-02') - 2) == '2018-11-30'
-    did.base.TODAY = today
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -156,20 +117,12 @@ def test_User():
     assert User
 
     # No email provided
-    try:
-        user = User("")
-    except ConfigError:
-        pass
-    else:
-        raise RuntimeError("No exception for missing email")
+    with pytest.raises(ConfigError):
+        User("")
 
     # Invalid email address
-    try:
-        user = User("bad-email")
-    except ConfigError:
-        pass
-    else:
-        raise RuntimeError("No exception for invalid email")
+    with pytest.raises(ConfigError):
+        User("bad-email")
 
     # Short email format
     user = User("some@email.org")
@@ -186,12 +139,8 @@ def test_User():
     assert str(user) == "Some Body <some@email.org>"
 
     # Invalid alias definition
-    try:
-        user = User("some@email.org; bad-alias", stats="bz")
-    except ConfigError:
-        pass
-    else:
-        raise RuntimeError("No exception for invalid alias definition")
+    with pytest.raises(ConfigError):
+        User("some@email.org; bad-alias", stats="bz")
 
     # Custom email alias
     user = User("some@email.org; bz: bugzilla@email.org", stats="bz")
@@ -251,77 +200,76 @@ def test_ReportError():
 #  Token handling
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-class TestGetToken(unittest.TestCase):
-    """ Tests for the `get_token` function """
-
-    @contextmanager
-    def get_token_as_file(self, token: str) -> str:
-        """
-        Returns a temporary filename with the given token written to it.
-        Use this as a context manager:
-
-            with self.get_token_as_file(token="foobar") as filename:
-                config = {"token_file": filename.name}
-        """
-        file_handle = NamedTemporaryFile(mode="w+", encoding="utf-8")
-        file_handle.writelines(token)
-        file_handle.flush()
-        try:
-            yield file_handle.name
-        finally:
-            file_handle.close()
-
-    def test_get_token_none(self):
-        """ Test getting a token when none is specified """
-        self.assertIsNone(get_token({}))
-
-    def test_get_token_plain(self):
-        """ Test getting a token when specified in plain config file """
-        token = str(uuid4())
-        config = {"token": token}
-        self.assertEqual(get_token(config), token)
-
-    def test_get_token_plain_empty(self):
-        """ Test getting a token when it is empty or just whitespace """
-        config = {"token": "   "}
-        self.assertIsNone(get_token(config))
-
-    def test_get_token_plain_different_name(self):
-        """ Test getting a plain token under a different name """
-        token = str(uuid4())
-        config = {"mytoken": token}
-        self.assertIsNone(get_token(config))
-        self.assertEqual(get_token(config, token_key="mytoken"), token)
-
-    def test_get_token_file(self):
-        """ Test getting a token from a file """
-        token_in_file = str(uuid4())
-        with self.get_token_as_file(token_in_file) as filename:
-            config = {"token_file": filename}
-            self.assertEqual(get_token(config), token_in_file)
-
-    def test_get_token_file_empty(self):
-        """ Test getting a token from a file with just whitespace. """
-        token_in_file = "   "
-        with self.get_token_as_file(token_in_file) as filename:
-            config = {"token_file": filename}
-            self.assertIsNone(get_token(config))
-
-    def test_get_token_precedence(self):
-        """ Test plain token precedence over file one """
-        token_plain = str(uuid4())
-        token_in_file = str(uuid4())
-        with self.get_token_as_file(token_in_file) as filename:
-            config = {"token_file": filename, "token": token_plain}
-            self.assertEqual(get_token(config), token_plain)
-
-    def test_get_token_file_different_name(self):
-        """ Test getting a token from a file under different name """
-        token_in_file = str(uuid4())
-        with self.get_token_as_file(token_in_file) as filename:
-            config = {"mytoken_file": filename}
-            self.assertEqual(
-                get_token(
-                    config,
-                    token_file_key="mytoken_file"),
-                token_in_file)
+def token_file(tmp_path, token: str) -> str:
+    """ Return name of a temporary file with given token """
+    path = tmp_path / "token"
+    path.write_text(token, encoding="utf-8")
+    return str(path)
+
+
+def test_get_token_none():
+    """ Test getting a token when none is specified """
+    assert get_token({}) is None
+
+
+def test_get_token_plain():
+    """ Test getting a token when specified in plain config file """
+    token = str(uuid4())
+    config = {"token": token}
+    assert get_token(config) == token
+
+
+def test_get_token_plain_empty():
+    """ Test getting a token when it is empty or just whitespace """
+    config = {"token": "   "}
+    assert get_token(config) is None
+
+
+def test_get_token_plain_different_name():
+    """ Test getting a plain token under a different name """
+    token = str(uuid4())
+    config = {"mytoken": token}
+    assert get_token(config) is None
+    assert get_token(config, token_key="mytoken") == token
+
+
+def test_get_token_file(tmp_path):
+    """ Test getting a token from a file """
+    token_in_file = str(uuid4())
+    filename = token_file(tmp_path, token_in_file)
+    config = {"token_file": filename}
+    assert get_token(config) == token_in_file
+
+
+def test_get_token_file_empty(tmp_path):
+    """ Test getting a token from a file with just whitespace. """
+    token_in_file = "   "
+    filename = token_file(tmp_path, token_in_file)
+    config = {"token_file": filename}
+    assert get_token(config) is None
+
+
+def test_get_token_precedence(tmp_path):
+    """ Test plain token precedence over file one """
+    token_plain = str(uuid4())
+    token_in_file = str(uuid4())
+    filename = token_file(tmp_path, token_in_file)
+    config = {"token_file": filename, "token": token_plain}
+    assert get_token(config) == token_plain
+
+
+def test_get_token_file_different_name(tmp_path):
+    """ Test getting a token from a file under different name """
+    token_in_file = str(uuid4())
+    filename = token_file(tmp_path, token_in_file)
+    config = {"mytoken_file": filename}
+    assert get_token(
+        config, token_file_key="mytoken_file") == token_in_file
+
+
+def test_get_token_file_modified(tmp_path):
+    """ Test getting a token from a file changed in the meantime """
+    filename = token_file(tmp_path, "first")
+    assert get_token({"token_file": filename}) == "first"
+    filename = token_file(tmp_path, "second token")
+    assert get_token({"token_file": filename}) == "second token"
@@ -28,3 +28,44 @@ def test_EmptyStatsGroup():
     # simple test that import works
     from did.stats import EmptyStatsGroup
     assert EmptyStatsGroup
+
+
+def test_StatsGroup_prefetch():
+    # prefetched children are not fetched again when checked
+    from did.stats import Stats, StatsGroup
+    fetched = []
+
+    class Counted(Stats):
+        def fetch(self):
+            fetched.append(self.option)
+
+    class Prefetched(StatsGroup):
+        prefetch_workers = 2
+
+    group = Prefetched("group")
+    group.stats = [Counted(option, parent=group) for option in "abc"]
+    group.check()
+    assert sorted(fetched) == ["a", "b", "c"]
+
+
+def test_StatsGroup_prefetch_error():
+    # errors of the prefetch are reported without fetching again
+    import pytest
+
+    from did.base import ReportError
+    from did.stats import Stats, StatsGroup
+    fetched = []
+
+    class Failing(Stats):
+        def fetch(self):
+            fetched.append(self.option)
+            raise ReportError("Unable to fetch {0}".format(self.option))
+
+    class Prefetched(StatsGroup):
+        prefetch_workers = 2
+
+    group = Prefetched("group")
+    group.stats = [Failing(option, parent=group) for option in "ab"]
+    with pytest.raises(ReportError):
+        group.check()
+    assert sorted(fetched) == ["a", "b"]
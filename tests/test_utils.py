@@ -1,6 +1,7 @@
 # coding: utf-8
 
 import os
+import time
 
 import pytest
 
@@ -73,6 +74,62 @@ def test_load_components():
     assert did.utils.load_components("did.plugins") > 0
 
 
+def test_load_components_cached(monkeypatch):
+    from did.utils import load_components
+    loaded = load_components("did.plugins")
+    # Second load should not scan the package again
+    monkeypatch.setattr("pkgutil.iter_modules", None)
+    assert load_components("did.plugins") == loaded
+
+
+def test_cache_hit(tmp_path):
+    from did.utils import Cache
+    path = str(tmp_path / "cache.json")
+    cache = Cache(path, "Test", revalidation=60)
+    cache.store("key", {"a": 1}, etag='"abc"', expiration=60)
+    cache.save()
+    # Fresh entries are used without revalidation
+    cache = Cache(path, "Test", revalidation=60)
+    assert cache.fresh("key")["data"] == {"a": 1}
+
+
+def test_cache_revalidation(tmp_path, monkeypatch):
+    from did.utils import Cache
+    cache = Cache(str(tmp_path / "cache.json"), "Test", revalidation=60)
+    cache.store("key", [1, 2], etag='"abc"', expiration=10)
+    monkeypatch.setattr("time.time", lambda: time.time_ns() / 1e9 + 30)
+    # Expired entry has to be confirmed by the server (304)
+    assert cache.fresh("key") is None
+    assert cache.headers("key") == {"If-None-Match": '"abc"'}
+    assert cache.revalidated("key", 10)["data"] == [1, 2]
+    assert cache.fresh("key")["data"] == [1, 2]
+
+
+def test_cache_expiry(tmp_path, monkeypatch):
+    from did.utils import Cache
+    path = str(tmp_path / "cache.json")
+    cache = Cache(path, "Test", revalidation=60)
+    cache.store("etag", "data", etag='"abc"', expiration=10)
+    cache.store("plain", "data", expiration=10)
+    # Without an ETag expired entries cannot be revalidated
+    monkeypatch.setattr("time.time", lambda: time.time_ns() / 1e9 + 30)
+    cache.save()
+    assert list(Cache(path, "Test", revalidation=60).entries) == ["etag"]
+    # Revalidable entries are dropped after a while as well
+    monkeypatch.setattr("time.time", lambda: time.time_ns() / 1e9 + 100)
+    cache.save()
+    assert Cache(path, "Test", revalidation=60).entries == {}
+
+
+def test_cache_disabled():
+    from did.utils import Cache
+    cache = Cache(None, "Test", revalidation=60)
+    cache.store("key", "data", etag='"abc"', expiration=60)
+    assert cache.fresh("key") is None
+    assert cache.headers("key") == {}
+    cache.save()
+
+
 def test_import_failure():
     from did.utils import _import
     with pytest.raises(ImportError):